@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# author: Xiguang Liu<g10guang@foxmail.com>
+# 2026-10-17
+# 适用于非负整数权重的单调优先队列（monotone priority queue），用于 Dijkstra
+# Dijkstra 中出队的距离单调不减，如果所有权重都是不大于 C 的非负整数，那么可以使用 bucket 代替比较堆：
+# Dial: 使用 C + 1 个循环 bucket，d[v] 落在 bucket[d[v] % (C + 1)]，总时间复杂度 O(V * C + E)
+# Radix heap: 按照 key 与上一次出队的 key 的最高不同二进制位划分 bucket，
+#             每个元素最多被重新分配 log(C) 次，总时间复杂度 O(E + V * logC)
+# 两者都和 course16.dijkstra.HeapQueue 一样使用 lazy deletion，出队时由调用者跳过已经确定最短路径的顶点
+import random
+
+
+class DialQueue(object):
+    """
+    Dial 算法使用的循环 bucket 队列
+    要求插入的 key 不小于上一次出队的 key，并且不超过上一次出队的 key + max_weight
+    """
+
+    def __init__(self, max_weight: int) -> None:
+        super().__init__()
+        self.buckets = [[] for _ in range(max_weight + 1)]
+        # 当前正在出队的 key
+        self.cursor = 0
+        self.size = 0
+
+    def push(self, key: int, item):
+        """
+        插入 item，优先级为 key
+        :param key:
+        :param item:
+        :return:
+        """
+        self.buckets[key % len(self.buckets)].append(item)
+        self.size += 1
+
+    def pop(self):
+        """
+        弹出 key 最小的 (key, item)
+        :return:
+        """
+        if not self.size:
+            raise IndexError('pop from empty queue')
+        while not self.buckets[self.cursor % len(self.buckets)]:
+            self.cursor += 1
+        self.size -= 1
+        return self.cursor, self.buckets[self.cursor % len(self.buckets)].pop()
+
+    def __len__(self):
+        return self.size
+
+
+class RadixHeap(object):
+    """
+    Radix heap
+    buckets[i] 保存与上一次出队的 key 最高不同二进制位为第 i 位的元素，buckets[0] 保存与上一次出队的 key 相同的元素
+    要求插入的 key 为不小于上一次出队的 key 的 int，push 时检查，不需要事先扫描图中所有边的权重
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.last = 0
+        self.buckets = [[]]
+        self.size = 0
+
+    def push(self, key: int, item):
+        """
+        插入 item，优先级为 key
+        :param key:
+        :param item:
+        :return: key 不是 int 或者小于上一次出队的 key（图中存在负权重）时抛出 ValueError
+        """
+        if not isinstance(key, int) or key < self.last:
+            raise ValueError('radix heap requires non-negative int weights but key {} is pushed after {}'.format(
+                key, self.last))
+        i = (key ^ self.last).bit_length()
+        while len(self.buckets) <= i:
+            self.buckets.append([])
+        self.buckets[i].append((key, item))
+        self.size += 1
+
+    def pop(self):
+        """
+        弹出 key 最小的 (key, item)
+        buckets[0] 为空时，找到第一个非空的 bucket，以其中最小的 key 作为 last，将其中的元素重新分配到更低的 bucket 中
+        :return:
+        """
+        if not self.size:
+            raise IndexError('pop from empty queue')
+        if not self.buckets[0]:
+            i = 1
+            while not self.buckets[i]:
+                i += 1
+            bucket = self.buckets[i]
+            self.buckets[i] = []
+            self.last = min(key for key, item in bucket)
+            for key, item in bucket:
+                self.buckets[(key ^ self.last).bit_length()].append((key, item))
+        self.size -= 1
+        return self.buckets[0].pop()
+
+    def __len__(self):
+        return self.size
+
+
+def test():
+    for queue in (DialQueue(10), RadixHeap()):
+        result = []
+        queue.push(0, 0)
+        while queue:
+            key, item = queue.pop()
+            result.append(key)
+            if len(result) < 1000:
+                for _ in range(random.randint(0, 2)):
+                    queue.push(key + random.randint(0, 10), item + 1)
+        print(type(queue).__name__, result == sorted(result))
+    queue = RadixHeap()
+    queue.push(5, 'a')
+    queue.pop()
+    for key in (4, 5.5):
+        try:
+            queue.push(key, 'b')
+        except ValueError as exception:
+            print(exception)
+
+
+if __name__ == '__main__':
+    test()
@@ -4,25 +4,44 @@
 # 2018-01-21 18:47
 # 使用 Dijkstra 算法求原点 s 到图中其他顶点的最小路径长度，以及输出对应的路径
 # Dijkstra 适用于有向无环图，如果有向图中存在 negative cycle 那么，Dijkstra 无法得出正确的结果
+# queue='set' 时 Q 为 set，每次 extract_min 需要 O(V)，总时间复杂度为 O(V^2)
+# queue='heap' 时 Q 为二叉堆，总时间复杂度为 O((V+E)logV)
+# queue='dial' / 'radix' 时 Q 为 bucket 队列，只适用于非负整数权重，见 course16.bucket_queue
+# queue='auto' 时根据图中的权重自动选择
+import heapq
 import sys
 
-from course13.graph import DirectGraph, Vertex
+from course13.graph import CSRGraph, DirectGraph, Vertex
+from course16.bucket_queue import DialQueue, RadixHeap
+from tools.count_time import count_time
+from tools.mock_data import mock_direct_graph
 
+# 所有权重都是不超过 BUCKET_BOUND 的非负整数时，queue='auto' 选择 Dial，超过时选择 radix heap
+BUCKET_BOUND = 1024
 
-def dijkstra(dg: DirectGraph, s: Vertex):
+
+def dijkstra(dg: DirectGraph, s: Vertex, queue: str = 'auto', bucket_bound: int = BUCKET_BOUND):
     """
     使用 Dijkstra 遍历有向无环图，假设该图为有向无环图 DAG，以下代码不做判断
-    :param dg: course13.graph.DirectGraph
+    :param dg: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
     :param s: 寻找DAG中所有顶点到 s 的最短路径 S.P
+    :param queue: 'set' 使用 set 保存 Q，'auto' 自动选择，或者为 QUEUES 中的优先队列
+    :param bucket_bound: queue='auto' 时，最大权重不超过该值才选择 Dial
     :return:
     """
     if not dg.has_vertex(s):
         print(dg)
         raise Exception("顶点: {} 不在 DAG 中")
+    if queue != 'set':
+        d, pai = queue_dijkstra(dg, dg.ids[s], new_queue(dg, queue, bucket_bound))
+        return dg.by_vertex(d), dg.parent_by_vertex(pai)
+    if isinstance(dg, CSRGraph):
+        return csr_dijkstra(dg, s)
     # S 为已经找到最短路径的顶点
     # Q 为尚未找到最短路径的顶点
     # d 为对应目前迭代中该顶点到 s 的距离
     # pai 用于记录在最短路径中，该顶点的上一个顶点
+    # 以上均使用顶点 id 表示顶点，d、pai 为以顶点 id 为下标的 list
     S, Q, d, pai = initialize(dg, s)
     while Q:
         # extract-min from Q
@@ -34,7 +53,7 @@ def dijkstra(dg: DirectGraph, s: Vertex):
         else:
             # 所有可以被 S 达到的顶点都已经被遍历，剩下的顶点无法从 s 到达
             break
-    return d, pai
+    return dg.by_vertex(d), dg.parent_by_vertex(pai)
 
 
 def initialize(dg: DirectGraph, s):
@@ -44,21 +63,21 @@ def initialize(dg: DirectGraph, s):
     :param s:
     :return:
     """
+    si = dg.ids[s]
     # 所有已经找到了最短路径的顶点集和
-    S = {s}
+    S = {si}
     # 所有还没有找到最短路径的顶点集和
     Q = set()
-    d = {s: 0}
-    pai = {s: None}
+    d = [0] * len(dg.vexes)
+    pai = [None] * len(dg.vexes)
     # 将所有非 s 顶点加入到 Q 中
-    for v in dg.vertexes:
-        pai[v] = None
-        if v != s:
-            Q.add(v)
-            d[v] = dg.get_edge_weight(s, v)
+    for i, v in enumerate(dg.vexes):
+        if i != si:
+            Q.add(i)
+            d[i] = dg.get_edge_weight(s, v)
             # 如果是 d[v] = sys.maxsize 则证明 s-x->t 不存在这样的路径
-            if d[v] < sys.maxsize:
-                pai[v] = s
+            if d[i] < sys.maxsize:
+                pai[i] = si
     return S, Q, d, pai
 
 
@@ -80,16 +99,16 @@ def extract_min(Q, d) -> (Vertex, int):
     return v, minimize
 
 
-def relax(dg: DirectGraph, d: dict, pai: dict, v: Vertex):
+def relax(dg: DirectGraph, d: list, pai: list, v: int):
     """
     加入新的顶点到 S 后，更新 d
     :param dg:
     :param d:
-    :param v: 新加入的顶点
+    :param v: 新加入的顶点 id
     :param pai:
     :return:
     """
-    for x, weight in dg.edges[v]:
+    for x, weight in dg.adjacent(v):
         if d[x] > d[v] + weight:
             d[x] = d[v] + weight
             # 即使当前找到的 v-->x 不是最优路径，但是如果存在最优路径 y-->x，那么后面也绝对会再次更新 pai，所以 Dijkstra 算法结束后，
@@ -97,6 +116,149 @@ def relax(dg: DirectGraph, d: dict, pai: dict, v: Vertex):
             pai[x] = v
 
 
+class HeapQueue(object):
+    """
+    使用 heapq 实现的二叉堆优先队列
+    heapq 不支持 decrease-key，顶点的距离变小时直接插入新的 (距离, 顶点)，
+    旧的记录仍然留在堆中（lazy deletion），出堆时由调用者跳过已经确定最短路径的顶点
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.heap = []
+
+    def push(self, key, item):
+        """
+        插入 item，优先级为 key
+        :param key:
+        :param item:
+        :return:
+        """
+        heapq.heappush(self.heap, (key, item))
+
+    def pop(self):
+        """
+        弹出 key 最小的 (key, item)
+        :return:
+        """
+        return heapq.heappop(self.heap)
+
+    def top(self):
+        """
+        查看 key 最小的 (key, item)，不弹出
+        :return:
+        """
+        return self.heap[0]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+# dijkstra 中 queue 参数可以选择的优先队列，参数为图中最大权重的上界
+QUEUES = {
+    'heap': lambda max_weight: HeapQueue(),
+    'dial': DialQueue,
+    'radix': lambda max_weight: RadixHeap(),
+}
+
+
+def new_queue(g, queue: str, bucket_bound: int = BUCKET_BOUND):
+    """
+    创建 queue 对应的空优先队列，不需要扫描图中所有边的权重：
+    'auto' 和 'dial' 使用图中缓存的 int_weight_bound，'radix' 在 push 时检查权重
+    queue='auto' 时：所有权重都是非负整数并且不超过 bucket_bound 选择 Dial，超过 bucket_bound 选择 radix heap，否则选择二叉堆
+    :param g:
+    :param queue:
+    :param bucket_bound:
+    :return:
+    """
+    if queue != 'auto' and queue not in QUEUES:
+        raise ValueError('queue should be one of {} but {} is given'.format(['auto'] + sorted(QUEUES), queue))
+    if queue in ('heap', 'radix'):
+        return QUEUES[queue](None)
+    max_weight = g.int_weight_bound
+    if queue == 'auto':
+        if max_weight is None:
+            queue = 'heap'
+        elif max_weight <= bucket_bound:
+            queue = 'dial'
+        else:
+            queue = 'radix'
+    elif max_weight is None:
+        raise ValueError('queue {} requires non-negative int weights'.format(queue))
+    return QUEUES[queue](max_weight)
+
+
+def queue_dijkstra(g, si: int, pq, ti: int = None):
+    """
+    使用优先队列 pq 执行 Dijkstra，每个顶点出队一次，每条边最多入队一次，
+    使用 HeapQueue 时时间复杂度为 O((V+E)logV)
+    :param g: course13.graph.Graph 或者 course13.graph.CSRGraph
+    :param si: 源点 id
+    :param pq: 空的优先队列
+    :param ti: 目标顶点 id，不为 None 时 ti 出队后立即停止搜索
+    :return: 以顶点 id 为下标的 d, pai
+    """
+    d = [sys.maxsize] * g.get_vertex_num()
+    pai = [None] * g.get_vertex_num()
+    # done[v] 为 True 代表 v 已经加入 S，已经找到最短路径
+    done = [False] * g.get_vertex_num()
+    d[si] = 0
+    pq.push(0, si)
+    while pq:
+        dv, v = pq.pop()
+        if done[v]:
+            # lazy deletion 留下的过期记录
+            continue
+        done[v] = True
+        if v == ti:
+            break
+        for x, weight in g.adjacent(v):
+            if d[x] > dv + weight:
+                d[x] = dv + weight
+                pai[x] = v
+                pq.push(d[x], x)
+    return d, pai
+
+
+def csr_dijkstra(g: CSRGraph, s: Vertex):
+    """
+    在 CSR 图上执行 Dijkstra，d、pai 为以顶点 id 为下标的 list，遍历出边时直接访问连续内存
+    :param g:
+    :param s:
+    :return: 与 dijkstra 相同的 d, pai
+    """
+    offsets, targets, weights = g.offsets, g.targets, g.weights
+    si = g.ids[s]
+    d = [sys.maxsize] * g.get_vertex_num()
+    pai = [None] * g.get_vertex_num()
+    d[si] = 0
+    csr_relax(offsets, targets, weights, d, pai, si)
+    Q = set(range(g.get_vertex_num()))
+    Q.remove(si)
+    while Q:
+        v, minimize = extract_min(Q, d)
+        if v is None:
+            break
+        Q.remove(v)
+        csr_relax(offsets, targets, weights, d, pai, v)
+    return g.by_vertex(d), g.parent_by_vertex(pai)
+
+
+def csr_relax(offsets, targets, weights, d: list, pai: list, v: int):
+    """
+    CSR 图中加入新的顶点 v 到 S 后，更新 d
+    :param v: 新加入的顶点 id
+    :return:
+    """
+    dv = d[v]
+    for k in range(offsets[v], offsets[v + 1]):
+        x = targets[k]
+        if d[x] > dv + weights[k]:
+            d[x] = dv + weights[k]
+            pai[x] = v
+
+
 def test_dijkstra():
     dg = DirectGraph()
     a = Vertex('a')
@@ -124,8 +286,27 @@ def test_dijkstra():
     dg.add_edge(b, e, 2)
     dg.add_edge(e, g, 3)
 
-    d, pai = dijkstra(dg, a)
+    d, pai = dijkstra(dg, a, queue='set')
     print(d, pai)
+    print(dijkstra(CSRGraph(dg), a, queue='set') == (d, pai))
+    for queue in ('heap', 'dial', 'radix', 'auto'):
+        print(queue, dijkstra(dg, a, queue=queue)[0] == d)
+
+
+def benchmark_queues(vexnum=200000, edgenum=800000, max_weight=100):
+    """
+    在随机的整数权重图上比较二叉堆与 bucket 队列
+    :return:
+    """
+    dg, vexes = mock_direct_graph(vexnum, edgenum, max_weight)
+    csr = CSRGraph(dg)
+    result = None
+    for queue in ('heap', 'dial', 'radix'):
+        print('queue: {}'.format(queue), end=' ')
+        d, pai = count_time(dijkstra)(csr, vexes[0], queue=queue)
+        if result is not None and d != result:
+            print('算法设计失败')
+        result = d
 
 
 if __name__ == '__main__':
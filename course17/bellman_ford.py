@@ -17,42 +17,65 @@
 #     for each edge(u, v) belong to E:
 #         do if d[v] > d[u] + w(u, v)
 #             then report a negative weight cycle
+# 优化：
+# 1. 如果某一次循环中没有任何边被 relax，那么 d 已经收敛，可以提前结束
+# 2. SPFA（Shortest Path Faster Algorithm）：只有 d 发生变化的顶点的出边才可能被 relax，使用 FIFO 队列记录这些顶点，
+#    如果某个顶点入队次数达到 |V|，证明存在 negative-weight cycle
+# 3. 使用 NumPy 将所有边导出为 src, dst, w 三个数组，每次循环使用 np.minimum.at 一次性 relax 所有边
+# 找出 negative-weight cycle：
+# 只有 d[v] 严格变小时才更新 pai[v]，这样 pai 构成的图中如果出现环，那么该环一定是 negative-weight cycle，
+# 第 |V| 次循环中 d 仍然变小的顶点受到 negative-weight cycle 的影响，每个可以到达的 negative-weight cycle 上都有这样的顶点，
+# 但是下游环上顶点的 pai 可能指向上游的环，所以只用这些顶点确定需要检查的强连通分量，在每个分量内部单独查找环
 import sys
+from collections import deque
 
-from course13.graph import DirectGraph, Vertex
+from course13.graph import CSRGraph, DirectGraph, Vertex, strongly_connected_components
+from course16.dijkstra import dijkstra
 
 
 class NegativeCycleException(Exception):
     """
     发现 negative-cycle 抛出异常
+    cycles 为找到的所有 negative-weight cycle [(顶点 list, 环的总权重)]，顶点 list 中相邻两个顶点之间有边，最后一个顶点有边指向第一个顶点
     """
-    pass
 
+    def __init__(self, cycles: list = None) -> None:
+        super().__init__("Negative cycle")
+        self.cycles = cycles or []
 
-def bellman_ford(dg: DirectGraph, s: Vertex):
+
+def bellman_ford(dg: DirectGraph, s: Vertex, mode: str = 'pass'):
     """
     使用 Bellman-Ford 寻找图中的最短路径
     :param dg: 有向图，其中图中可以存在 negative-weight cycle，Bellman-Ford 算法可以发现 negative-weight cycle
+               也可以是 course13.graph.CSRGraph
     :param s: 源点 s
-    :return:
+    :param mode: 'pass' 每次循环遍历所有边，没有边被 relax 时提前结束；'queue' 使用 SPFA；'numpy' 使用 NumPy 向量化
+    :return: d, pai，如果从 s 可以到达 negative-weight cycle，抛出 NegativeCycleException，其中包含找到的所有 negative-weight cycle
     """
+    if mode == 'queue':
+        return queue_bellman_ford(dg, s)
+    if mode == 'numpy':
+        return numpy_bellman_ford(dg, s)
+    if mode != 'pass':
+        raise ValueError("mode should be 'pass', 'queue' or 'numpy' but {} is given".format(mode))
+    if isinstance(dg, CSRGraph):
+        return csr_bellman_ford(dg, s)
     # d 用来记录每个顶点距离 s 的最短路径
     # pai 用于记录每个顶点在最短路径中访问的上一个顶点
+    # d、pai 均为以顶点 id 为下标的 list
     d, pai = initialize(dg, s)
     vertex_num = dg.get_vertex_num()
-    # 进行 |V| - 1 次循环
+    # 最多进行 |V| - 1 次循环
     for _ in range(1, vertex_num):
         # 这里从每个顶点开始遍历每一条边
-        for u, l in dg.edges.items():
-            for v, w in l:
-                relax(u, v, w, d, pai)
-    try:
-        check(dg, d)
-    except NegativeCycleException:
-        print("图中存在 negative-weight cycle")
+        if not sweep(dg, d, pai):
+            # d 已经收敛，不可能存在 negative-weight cycle
+            break
     else:
-        print("图中不存在 negative-weight cycle")
-    return d, pai
+        # 第 |V| 次循环
+        check(dg, sweep(dg, d, pai))
+    return dg.by_vertex(d), dg.parent_by_vertex(pai)
 
 
 def initialize(dg: DirectGraph, s: Vertex):
@@ -61,45 +84,348 @@ def initialize(dg: DirectGraph, s: Vertex):
     :param dg:
     :return:
     """
-    d = {s: 0}
-    pai = {s: None}
-    for v in dg.vertexes:
-        pai[v] = None
-        if v != s:
-            d[v] = dg.get_edge_weight(s, v)
+    si = dg.ids[s]
+    d = [0] * len(dg.vexes)
+    pai = [None] * len(dg.vexes)
+    for i, v in enumerate(dg.vexes):
+        if i != si:
+            d[i] = dg.get_edge_weight(s, v)
             # 使用 sys.maxsize 代表两者之间没有任何关联
-            if d[v] < sys.maxsize:
-                pai[v] = s
+            if d[i] < sys.maxsize:
+                pai[i] = si
     return d, pai
 
 
-def relax(u: Vertex, v: Vertex, w, d: dict, pai: dict):
+def relax(u: int, v: int, w, d: list, pai: list):
     """
-    使用 (u, v) 边更新 d 和 pai
+    使用 (u, v) 边更新 d 和 pai，u、v 为顶点 id
     :param w:
     :param d:
     :param pai:
     :param dg:
     :param u:
     :param v:
-    :return:
+    :return: 是否更新了 d[v]
     """
-    if d[v] > d[u] + w:
+    # sys.maxsize 代表 u 尚不可达，不能从 u 进行 relax
+    if d[u] < sys.maxsize and d[v] > d[u] + w:
         d[v] = d[u] + w
         pai[v] = u
+        return True
+    return False
+
+
+def sweep(dg: DirectGraph, d: list, pai: list):
+    """
+    使用图中的每一条边 relax 一次
+    :return: d 被更新的顶点 id，没有顶点被更新时为空 list
+    """
+    relaxed = []
+    for u in range(dg.get_vertex_num()):
+        for v, w in dg.adjacent(u):
+            if relax(u, v, w, d, pai):
+                relaxed.append(v)
+    return relaxed
+
+
+def check(dg: DirectGraph, relaxed: list):
+    """
+    检查图中是否存在 negative-weight cycle，存在时抛出包含所有找到的 negative-weight cycle 的 NegativeCycleException
+    :param relaxed: 与 negative_cycles 相同
+    :return:
+    """
+    cycles = negative_cycles(dg, relaxed)
+    if cycles:
+        raise NegativeCycleException(cycles)
+
+
+def negative_cycles(dg: DirectGraph, relaxed: list):
+    """
+    找出所有可以到达的 negative-weight cycle
+    relaxed 为第 |V| 次循环中 d 仍然变小的顶点，或者 SPFA 中入队次数超过上限的顶点，每个可以到达的 negative-weight cycle 上都有 relaxed 中的顶点。
+    Bellman-Ford 结束时的 pai 只记录每个顶点最后一次变小时的来源，下游环上顶点的 pai 可能指向上游的环，
+    沿着 pai 只能找到一部分环，并且找到哪些环与 relax 的顺序有关，
+    所以只用 relaxed 确定需要检查的强连通分量，在每个分量内部使用 component_cycles 单独查找，每种模式都得到相同的结果
+    :param dg:
+    :param relaxed: 顶点 id
+    :return: [(顶点 list, 环的总权重)]，按照强连通分量的编号排列，relaxed 为空时返回 []
+    """
+    if not relaxed:
+        return []
+    component, count = strongly_connected_components(dg)
+    groups = {component[v]: [] for v in relaxed}
+    for i, c in enumerate(component):
+        if c in groups:
+            groups[c].append(i)
+    cycles = []
+    for c in sorted(groups):
+        cycles.extend(component_cycles(dg, component, c, groups[c]))
+    return [([dg.vexes[i] for i in cycle], cycle_weight(dg, cycle)) for cycle in cycles]
+
+
+def component_cycles(dg: DirectGraph, component: list, c: int, group: list):
+    """
+    在编号为 c 的强连通分量内部执行 Bellman-Ford，所有顶点的 d 初始化为 0，只使用两端都在分量内部的边，
+    每次循环之后从这次循环中 d 变小的顶点出发沿着 pai 查找环，找到环或者 d 收敛时结束，
+    分量中没有 negative-weight cycle 时最多 |group| 次循环就会收敛，否则最晚在第 |group| 次循环之后 pai 中出现环，通常只需要很少的循环
+    :param component: strongly_connected_components 的结果
+    :param c: 强连通分量的编号
+    :param group: 分量中的所有顶点 id
+    :return: [[顶点 id]]，分量中没有 negative-weight cycle 时为 []
+    """
+    d = dict.fromkeys(group, 0)
+    pai = {}
+    for _ in range(len(group)):
+        relaxed = []
+        for u in group:
+            for v, w in dg.adjacent(u):
+                if component[v] == c and d[v] > d[u] + w:
+                    d[v] = d[u] + w
+                    pai[v] = u
+                    relaxed.append(v)
+        if not relaxed:
+            return []
+        cycles = find_cycles(pai, relaxed)
+        if cycles:
+            return cycles
+    return []
 
 
-def check(dg: DirectGraph, d: dict):
+def find_cycles(pai: dict, starts: list):
     """
-    检查图中是否存在 negative-weight cycle
+    从 starts 中的顶点出发，找出沿着 pai 可以到达的所有环，每个顶点最多只有一个 pai，所以每个顶点最多只会被访问一次，
+    时间复杂度为 O(访问的顶点数)
+    :param pai: {顶点 id: 上一个顶点 id}
+    :param starts: 顶点 id
+    :return: [[顶点 id]]，每个环按照边的方向排列
+    """
+    # color[v] 为访问 v 的那一次遍历的起点
+    color = {}
+    cycles = []
+    for x in starts:
+        if x in color:
+            # 已经在之前的遍历中访问过，starts 中可能有重复的顶点
+            continue
+        path = []
+        y = x
+        while y is not None and y not in color:
+            color[y] = x
+            path.append(y)
+            y = pai.get(y)
+        if y is not None and color[y] == x:
+            # 本次遍历回到了本次遍历访问过的顶点，path 中从 y 开始的部分为环，沿 pai 的方向与边的方向相反
+            cycle = path[path.index(y):]
+            cycle.reverse()
+            cycles.append(cycle)
+    return cycles
+
+
+def cycle_weight(dg: DirectGraph, cycle: list):
+    """
+    计算环的总权重，两个顶点之间有多条边时取权重最小的边
+    :param cycle: 按照边的方向排列的顶点 id
     :return:
     """
-    for u, l in dg.edges.items():
-        for v, w in l:
-            # 如果图中不存在 negative-cycle 那么 d[v] 应该是最小值
+    total = 0
+    for u, v in zip(cycle, cycle[1:] + cycle[:1]):
+        total += min(w for x, w in dg.adjacent(u) if x == v)
+    return total
+
+
+def spfa(dg: DirectGraph, d: list, pai: list, sources: list, limit: int):
+    """
+    SPFA，从 sources 开始 relax
+    入队次数超过 limit 的顶点的 d 受到 negative-weight cycle 的影响，记录下来并且不再入队，其他顶点继续 relax 直到队列为空，
+    每个顶点最多入队 limit 次，所以一定会结束。队列为空时，除了被记录的顶点，其他顶点的出边都不能再 relax，
+    而可以到达的 negative-weight cycle 上总有一条边可以 relax，所以每个可以到达的 negative-weight cycle 上都有被记录的顶点
+    :param d: 以顶点 id 为下标，会被更新
+    :param pai: 以顶点 id 为下标，会被更新
+    :param sources: 初始时入队的顶点
+    :param limit: 没有 negative-weight cycle 时每个顶点入队次数的上限
+    :return: 入队次数超过 limit 的所有顶点 id，没有发现 negative-weight cycle 时为空 list
+    """
+    vertex_num = dg.get_vertex_num()
+    # in_queue[v] 记录 v 是否已经在队列中，count[v] 记录 v 入队的次数
+    in_queue = [False] * vertex_num
+    count = [0] * vertex_num
+    queue = deque(sources)
+    for v in sources:
+        in_queue[v] = True
+        count[v] = 1
+    over = []
+    while queue:
+        u = queue.popleft()
+        in_queue[u] = False
+        for v, w in dg.adjacent(u):
             if d[v] > d[u] + w:
-                # 经过 |V| - 1 次迭代后，图中还存在某个顶点的最短路径优化，证明该图中存在 negative-weight cycle
-                raise NegativeCycleException("Negative cycle")
+                d[v] = d[u] + w
+                pai[v] = u
+                if not in_queue[v]:
+                    count[v] += 1
+                    if count[v] > limit:
+                        if count[v] == limit + 1:
+                            over.append(v)
+                        continue
+                    queue.append(v)
+                    in_queue[v] = True
+    return over
+
+
+def queue_bellman_ford(dg: DirectGraph, s: Vertex):
+    """
+    使用 SPFA 寻找图中的最短路径，适用于 course13.graph.Graph 和 course13.graph.CSRGraph
+    队列中只保存 d 发生了变化、出边还没有被 relax 的顶点，最坏时间复杂度仍为 O(VE)，但大多数图上接近 O(E)
+    :param dg:
+    :param s:
+    :return: 与 bellman_ford 相同的 d, pai
+    """
+    vertex_num = dg.get_vertex_num()
+    si = dg.ids[s]
+    d = [sys.maxsize] * vertex_num
+    pai = [None] * vertex_num
+    d[si] = 0
+    # 没有 negative-weight cycle 时每个顶点最多入队 |V| - 1 次
+    check(dg, spfa(dg, d, pai, [si], vertex_num - 1))
+    return dg.by_vertex(d), dg.parent_by_vertex(pai)
+
+
+def super_source(dg: DirectGraph):
+    """
+    添加一个虚拟源点，到图中每个顶点都有一条权重为 0 的边，从虚拟源点执行 SPFA
+    等价于所有顶点的 d 初始化为 0，并且全部入队，不需要真正修改图
+    :param dg:
+    :return: 以顶点 id 为下标的 d，即虚拟源点到每个顶点的最短路径长度；存在 negative-weight cycle 时抛出 NegativeCycleException
+    """
+    vertex_num = dg.get_vertex_num()
+    d = [0] * vertex_num
+    pai = [None] * vertex_num
+    # 加上虚拟源点后图中有 |V| + 1 个顶点
+    check(dg, spfa(dg, d, pai, list(range(vertex_num)), vertex_num))
+    return d
+
+
+def has_negative_cycle(dg: DirectGraph):
+    """
+    判断图中是否存在 negative-weight cycle，不要求从某个源点可以到达
+    :param dg:
+    :return:
+    """
+    try:
+        super_source(dg)
+    except NegativeCycleException:
+        return True
+    return False
+
+
+def edge_arrays(g):
+    """
+    将图中所有边导出为 NumPy 数组 src, dst, w，第 k 条边为 src[k]-->dst[k]，权重为 w[k]
+    与 CSRGraph 一致，权重全部为 int 时 w 为 int64，否则为 float64
+    CSRGraph 的 targets/weights 直接共享内存，不需要复制
+    :param g: course13.graph.Graph 或者 course13.graph.CSRGraph
+    :return:
+    """
+    import numpy as np
+    if isinstance(g, CSRGraph):
+        offsets = np.frombuffer(g.offsets, dtype=np.int64)
+        src = np.repeat(np.arange(g.get_vertex_num(), dtype=np.int64), np.diff(offsets))
+        dst = np.frombuffer(g.targets, dtype=np.int64)
+        w = np.frombuffer(g.weights, dtype=np.int64 if g.weights.typecode == 'q' else np.float64)
+        return src, dst, w
+    src, dst, weights = [], [], []
+    for u in range(g.get_vertex_num()):
+        for v, weight in g.adjacent(u):
+            src.append(u)
+            dst.append(v)
+            weights.append(weight)
+    dtype = np.int64 if all(isinstance(weight, int) for weight in weights) else np.float64
+    return np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), np.array(weights, dtype=dtype)
+
+
+def numpy_bellman_ford(dg: DirectGraph, s: Vertex):
+    """
+    向量化的 Bellman-Ford，每次循环使用上一次循环的 d 计算 d[src] + w，再通过 np.minimum.at 按照 dst 取最小值，
+    d 不再变化时提前结束
+    第 k 次循环后 d[v] 为最多经过 k 条边的最短路径长度，hops[v] 记录 d[v] 最后一次变小是在第几次循环，
+    即最短路径最少需要的边数，最后一次性求 pai：满足 d[u] + w == d[v] 并且 hops[u] < hops[v] 的边 u-->v，
+    hops 的限制保证 pai 不会在 zero-weight cycle 上形成环
+    第 |V| 次循环中 d 仍然变小时，与 bellman_ford 相同，由 negative_cycles 在这些顶点所在的强连通分量中找出 negative-weight cycle
+    权重全部为 int 时 d 为 int64，使用 sys.maxsize 代表不可达，结果与 bellman_ford 一样为精确的 Python int；
+    否则 d 为 float64，使用 inf 代表不可达
+    :param dg:
+    :param s:
+    :return: 与 bellman_ford 相同的 d, pai
+    """
+    import numpy as np
+    src, dst, w = edge_arrays(dg)
+    vertex_num = dg.get_vertex_num()
+    si = dg.ids[s]
+    integral = np.issubdtype(w.dtype, np.integer)
+    unreachable = sys.maxsize if integral else np.inf
+    d = np.full(vertex_num, unreachable, dtype=w.dtype)
+    d[si] = 0
+    hops = np.zeros(vertex_num, dtype=np.int64)
+    for k in range(1, vertex_num + 1):
+        nd = d.copy()
+        # 不可达的起点不能 relax，int64 的 sys.maxsize + w 会溢出，所以直接使用 unreachable
+        candidate = np.where(d[src] != unreachable, d[src] + w, unreachable)
+        np.minimum.at(nd, dst, candidate)
+        changed = nd < d
+        if not changed.any():
+            break
+        if k == vertex_num:
+            # 第 |V| 次循环仍然有顶点的 d 变小
+            check(dg, np.nonzero(changed)[0].tolist())
+            break
+        hops[changed] = k
+        d = nd
+    tight = (d[src] != unreachable) & (d[src] + w == d[dst]) & (hops[src] < hops[dst])
+    pai = np.full(vertex_num, -1, dtype=np.int64)
+    pai[dst[tight]] = src[tight]
+    pai[si] = -1
+    d = d.tolist() if integral else [x if x < np.inf else sys.maxsize for x in d.tolist()]
+    pai = [p if p >= 0 else None for p in pai.tolist()]
+    return dg.by_vertex(d), dg.parent_by_vertex(pai)
+
+
+def csr_bellman_ford(g: CSRGraph, s: Vertex):
+    """
+    在 CSR 图上执行 Bellman-Ford，每一次循环顺序扫描 targets/weights 连续内存
+    :param g:
+    :param s:
+    :return: 与 bellman_ford 相同的 d, pai
+    """
+    offsets, targets, weights = g.offsets, g.targets, g.weights
+    vertex_num = g.get_vertex_num()
+    d = [sys.maxsize] * vertex_num
+    pai = [None] * vertex_num
+    d[g.ids[s]] = 0
+    for _ in range(1, vertex_num):
+        if not csr_sweep(offsets, targets, weights, d, pai):
+            break
+    else:
+        check(g, csr_sweep(offsets, targets, weights, d, pai))
+    return g.by_vertex(d), g.parent_by_vertex(pai)
+
+
+def csr_sweep(offsets, targets, weights, d: list, pai: list):
+    """
+    与 sweep 相同，使用 CSR 图中的每一条边 relax 一次
+    :return: d 被更新的顶点 id
+    """
+    relaxed = []
+    for u in range(len(d)):
+        du = d[u]
+        # 与 relax 中一致，sys.maxsize 代表尚不可达，不能从该顶点进行 relax
+        if du == sys.maxsize:
+            continue
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            if d[v] > du + weights[k]:
+                d[v] = du + weights[k]
+                pai[v] = u
+                relaxed.append(v)
+    return relaxed
 
 
 def test_bellman_ford():
@@ -129,8 +455,64 @@ def test_bellman_ford():
     dg.add_edge(b, e, 2)
     dg.add_edge(e, g, 3)
 
+    for mode in ('pass', 'queue', 'numpy'):
+        try:
+            bellman_ford(dg, a, mode=mode)
+        except NegativeCycleException as exception:
+            print(mode, exception.cycles)
+    print(has_negative_cycle(dg))
+    # 两个不相交的 negative-weight cycle，下游环 f-->g-->f 上顶点的 pai 可能指向上游的环 b-->c-->b，所有模式都应该找出两个环
+    two = DirectGraph()
+    for v in (a, b, c, f, g):
+        two.add_vertex(v)
+    two.add_edge(a, b, 1)
+    two.add_edge(b, c, -2)
+    two.add_edge(c, b, 1)
+    two.add_edge(c, f, 1)
+    two.add_edge(f, g, -2)
+    two.add_edge(g, f, 1)
+    found = []
+    for mode in ('pass', 'queue', 'numpy'):
+        try:
+            bellman_ford(two, a, mode=mode)
+        except NegativeCycleException as exception:
+            found.append(exception.cycles)
+    try:
+        bellman_ford(CSRGraph(two), a)
+    except NegativeCycleException as exception:
+        found.append(exception.cycles)
+    print(found[0], len(found) == 4 and all(cycles == found[0] for cycles in found))
+    dg.del_vertex(e)
+    print(has_negative_cycle(dg))
     d, pai = bellman_ford(dg, a)
     print(d, pai)
+    print(bellman_ford(CSRGraph(dg), a) == (d, pai))
+    print(bellman_ford(dg, a, mode='queue') == bellman_ford(dg, a))
+    print(bellman_ford(dg, a, mode='numpy') == bellman_ford(dg, a))
+    # 超过 2^53 的整数权重在 float64 中会丢失精度
+    big = DirectGraph()
+    for v in (a, b, c):
+        big.add_vertex(v)
+    big.add_edge(a, b, 2 ** 60 + 1)
+    big.add_edge(b, c, 1)
+    print(bellman_ford(big, a, mode='numpy'), bellman_ford(big, a, mode='numpy') == bellman_ford(big, a))
+    # 两个顶点之间有多条边时，所有引擎都使用按照 merge 策略合并后的同一条边
+    for merge in (None, 'min', 'last', 'sum'):
+        multi = DirectGraph(merge=merge)
+        for v in (a, b, c):
+            multi.add_vertex(v)
+        multi.add_edge(a, b, 1)
+        multi.add_edge(a, b, 5)
+        multi.add_edge(a, c, 4)
+        multi.add_edge(b, c, 1)
+        multi.add_edge(b, c, 2)
+        expect = bellman_ford(multi, a)
+        print(merge, expect[0], multi.edges[a],
+              all(result == expect for result in (bellman_ford(multi, a, mode='queue'),
+                                                  bellman_ford(multi, a, mode='numpy'),
+                                                  bellman_ford(CSRGraph(multi), a),
+                                                  dijkstra(multi, a),
+                                                  dijkstra(CSRGraph(multi), a, queue='set'))))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# author: Xiguang Liu<g10guang@foxmail.com>
+# 2026-10-17
+# 使用 A* 算法求顶点 s 到顶点 t 的最短路径
+# A* 是以 d[v] + h(v) 为优先级的 Dijkstra，其中 h(v) 为 v-->t 最短路径长度的下界（admissible heuristic）
+# h 越接近真实距离，需要访问的顶点越少，h = 0 时 A* 退化为 Dijkstra
+# ALT（A*, Landmarks, Triangle inequality）：预先选择 k 个 landmark L，用 Dijkstra 求出 L 到每个顶点的距离，
+# 由三角不等式 d(L, t) <= d(L, v) + d(v, t) 得到 h(v) = Max{d(L, t) - d(L, v)}
+# 如果 d(L, v) 有限而 d(L, t) 为无穷大，则 v 不可能到达 t
+import heapq
+import pickle
+import sys
+from array import array
+
+from course13.graph import DirectGraph, Vertex
+from course16.dijkstra import HeapQueue, queue_dijkstra
+from course18.st_dijkstra import path_to
+
+INF = float('inf')
+
+
+def astar(g: DirectGraph, s: Vertex, t: Vertex, heuristic=None):
+    """
+    使用 A* 寻找 s-->t 的最短路径，假设图中不存在 negative weight edge
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+    :param s: 源点
+    :param t: 目标顶点
+    :param heuristic: heuristic(v, t) 返回 v-->t 最短路径长度的下界，为 None 时使用 h = 0
+    :return: s-->t 的最短路径长度以及路径上的顶点 [s, ..., t]，不存在路径时返回 sys.maxsize, []
+    """
+    if not g.has_vertex(s) or not g.has_vertex(t):
+        raise KeyError('顶点 {} 或 {} 不在图中'.format(s, t))
+    si, ti = g.ids[s], g.ids[t]
+    # 每个顶点的 h 只计算一次
+    h = {}
+
+    def estimate(i):
+        if i not in h:
+            h[i] = heuristic(g.vexes[i], t) if heuristic is not None else 0
+        return h[i]
+
+    d = {si: 0}
+    pai = {si: None}
+    heap = [(estimate(si), 0, si)]
+    while heap:
+        f, dv, v = heapq.heappop(heap)
+        if dv > d[v]:
+            # lazy deletion 留下的过期记录
+            continue
+        if v == ti:
+            return dv, [g.vexes[i] for i in path_to(pai, ti)]
+        for x, w in g.adjacent(v):
+            if x not in d or d[x] > dv + w:
+                hx = estimate(x)
+                if hx == INF:
+                    # x 不可能到达 t
+                    continue
+                d[x] = dv + w
+                pai[x] = v
+                heapq.heappush(heap, (d[x] + hx, d[x], x))
+    return sys.maxsize, []
+
+
+class Landmarks(object):
+    """
+    ALT 预处理得到的 landmark 距离表
+    tables[k][i] 为第 k 个 landmark 到 values[i] 对应顶点的距离，不可达为 inf，每个表为连续存储的 array('d')
+    顶点通过 value 对应，所以保存到磁盘后可以由相同顶点构建的图加载
+    """
+
+    def __init__(self, values: list, landmarks: list, tables: list) -> None:
+        super().__init__()
+        self.values = values
+        self.landmarks = landmarks
+        self.tables = tables
+        self.ids = {Vertex(value): i for i, value in enumerate(values)}
+
+    @classmethod
+    def build(cls, g: DirectGraph, k: int):
+        """
+        选择 k 个 landmark 并求出距离表
+        第一个 landmark 为 id 为 0 的顶点，之后每次选择离已选 landmark 最远的顶点（farthest selection），
+        选择所用的距离就是已选 landmark 的 Dijkstra 结果，所以一共只需要运行 k 次 Dijkstra
+        :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+        :param k: landmark 数量
+        :return:
+        """
+        vexnum = g.get_vertex_num()
+        landmarks = []
+        tables = []
+        # nearest[i] 为顶点 i 到已选 landmark 的最小距离
+        nearest = [INF] * vexnum
+        li = 0
+        for _ in range(min(k, vexnum)):
+            landmarks.append(li)
+            d, pai = queue_dijkstra(g, li, HeapQueue())
+            table = array('d', (x if x < sys.maxsize else INF for x in d))
+            tables.append(table)
+            for i in range(vexnum):
+                if table[i] < nearest[i]:
+                    nearest[i] = table[i]
+            for x in landmarks:
+                nearest[x] = -1
+            li = max(range(vexnum), key=lambda i: nearest[i])
+        return cls([v.value for v in g.vexes], landmarks, tables)
+
+    def heuristic(self, v: Vertex, t: Vertex):
+        """
+        v-->t 最短路径长度的下界：Max{d(L, t) - d(L, v)}
+        :param v:
+        :param t:
+        :return: 下界，v 不可能到达 t 时返回 inf
+        """
+        vi, ti = self.ids[v], self.ids[t]
+        bound = 0
+        for table in self.tables:
+            dv, dt = table[vi], table[ti]
+            if dv == INF:
+                # L 不能到达 v，该 landmark 无法给出下界
+                continue
+            if dt - dv > bound:
+                bound = dt - dv
+        return bound
+
+    def save(self, path: str):
+        """
+        保存到磁盘
+        :param path:
+        :return:
+        """
+        with open(path, 'wb') as f:
+            pickle.dump({'values': self.values, 'landmarks': self.landmarks, 'tables': self.tables}, f)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        从磁盘加载
+        :param path:
+        :return:
+        """
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        return cls(data['values'], data['landmarks'], data['tables'])
+
+
+def test():
+    import os
+    import tempfile
+    dg = DirectGraph()
+    a = Vertex('a')
+    b = Vertex('b')
+    c = Vertex('c')
+    d = Vertex('d')
+    e = Vertex('e')
+    f = Vertex('f')
+    g = Vertex('g')
+    dg.add_vertex(a)
+    dg.add_vertex(b)
+    dg.add_vertex(c)
+    dg.add_vertex(d)
+    dg.add_vertex(e)
+    dg.add_vertex(f)
+    dg.add_vertex(g)
+    dg.add_edge(a, b, 2)
+    dg.add_edge(d, a, 3)
+    dg.add_edge(b, c, 3)
+    dg.add_edge(c, d, 5)
+    dg.add_edge(c, e, 6)
+    dg.add_edge(c, f, 4)
+    dg.add_edge(g, e, 1)
+    dg.add_edge(f, g, 2)
+    dg.add_edge(b, e, 2)
+    dg.add_edge(e, g, 3)
+
+    print(astar(dg, a, g))
+    landmarks = Landmarks.build(dg, 2)
+    path = os.path.join(tempfile.gettempdir(), 'landmarks.pkl')
+    landmarks.save(path)
+    landmarks = Landmarks.load(path)
+    os.remove(path)
+    print(landmarks.landmarks, landmarks.tables)
+    print(astar(dg, a, g, landmarks.heuristic))
+    print(astar(dg, e, a, landmarks.heuristic))
+
+
+if __name__ == '__main__':
+    test()
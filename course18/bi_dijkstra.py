@@ -4,14 +4,15 @@
 # 2018-01-22 19:59
 # 如果在图中需要搜索的目标是 single-source s and single-target t，那么可以对 Dijkstra 算法进行优化
 # 从 s 开始进行 forward Dijkstra search；从 t 开始进行 backward Dijkstra search
-# Qf df 分别表示 forward search 中尚未确定的顶点、df 表示当前其他结点到 s 的距离
-# Qb db 分别表示 backward search 中尚未确定的顶点、db 表示当前其他结点到 t 的最短路径
-# 判断停止的方法是：如果一个顶点已经在 Qf 和 Qb 中去除了，那么判断 df[w] + db[w] <= df[x] + db[x]
-# 其中 x 为其他在 Qf | Qb 并集中任意一个顶点
+# Qf df 分别表示 forward search 中尚未确定的顶点（二叉堆）、df 表示当前其他结点到 s 的距离
+# Qb db 分别表示 backward search 中尚未确定的顶点（二叉堆）、db 表示当前其他结点到 t 的最短路径
+# backward search 通过反向邻接链表 in_adjacent 遍历指向顶点的边
+# mu 为目前找到的最短的 s-->x-->t 路径长度，每次 relax 边 (v, x) 时，如果 x 已经被另一方向访问过，用 df[x] + db[x] 更新 mu
+# 判断停止的方法是：如果 Qf 的最小值 + Qb 的最小值 >= mu，那么不可能再找到更短的路径，mu 即为最短路径长度
 import sys
 
 from course13.graph import DirectGraph, Vertex
-from course16.dijkstra import extract_min, relax
+from course16.dijkstra import HeapQueue
 
 
 class NoPathException(Exception):
@@ -24,116 +25,108 @@ class NoPathException(Exception):
 def bi_dijkstra(dag: DirectGraph, s: Vertex, t: Vertex):
     """
     使用变种的 Dijkstra 算法求顶点 s 到顶点 t的最短路径
-    :param dag: 有向无环图
+    :param dag: 有向无环图，course13.graph.DirectGraph 或者 course13.graph.CSRGraph
     :param s: 源点
     :param t: 目标顶点
-    :return:
-    """
-    Sf, Sb, Qf, Qb, df, db, paif, paib = initialize(dag, s, t)
-    flag = False
-    fn = s
-    bn = t
-    while Qf:
-        flag = not flag
-        if flag:
-            n = forward(dag, Sf, Qf, df, paif)
-            fn = n
+    :return: df, db, paif, paib 只包含搜索过程中访问过的顶点，n 为最短路径上两个方向的搜索相遇的顶点
+    """
+    si, ti = dag.ids[s], dag.ids[t]
+    Sf, Sb, Qf, Qb, df, db, paif, paib = initialize(si, ti)
+    mu = 0 if si == ti else sys.maxsize
+    n = si if si == ti else None
+    while Qf and Qb:
+        # 丢弃堆顶已经确定最短路径的顶点的过期记录，使堆顶为真正的最小值
+        discard(Qf, Sf)
+        discard(Qb, Sb)
+        if not Qf or not Qb or Qf.top()[0] + Qb.top()[0] >= mu:
+            break
+        # 每次扩展堆顶更小的一方
+        if Qf.top()[0] <= Qb.top()[0]:
+            candidate, x = step(dag.adjacent, Sf, Qf, df, paif, db)
         else:
-            n = backward(dag, Sb, Qb, db, paib)
-            bn = n
-        if fn is None and bn is None:
-            # 证明 s-x->t 路径不存在
-            raise NoPathException('不存在路径 {s}-->{t}'.format(s=s, t=t))
-        if n is not None:
-            if n not in Qf and n not in Qb:
-                if judge(dag, df, db, n):
-                    # 成功找到最短路径
-                    return df, db, paif, paib, n
-                else:
-                    # 该顶点 n 不是最短路径上的顶点
-                    continue
-
-
-def forward(dag: DirectGraph, Sf: set, Qf: set, df: dict, paif: dict):
-    """
-    向前搜索 fom s
-    :return:
-    """
-    v, minimize = extract_min(Qf, df)
-    if v is not None:
-        Sf.add(v)
-        Qf.remove(v)
-        relax(dag, df, paif, v)
-    return v
-
-
-def backward(dag: DirectGraph, Sb: set, Qb: set, db: dict, paib: dict):
-    """
-    向后搜索 from t
-    :return:
-    """
-    v, minimize = extract_min(Qb, db)
-    if v is not None:
-        Sb.add(v)
-        Qb.remove(v)
-        backward_relax(dag, db, paib, v)
-    return v
-
-
-def backward_relax(dag: DirectGraph, db: dict, paib: dict, v: Vertex):
-    """
-    向后搜索过程中的 relax 取图的 weight 重量是反方向的，与 relax 不一致
-    :return:
-    """
-    # 这里由于图是邻接链表存储的，不能够快速的反向搜索边，只能够遍历图中的所有边，可以针对图的边数据结构优化
-    for x, pair in dag.edges.items():
-        for y, w in pair:
-            if v == y:
-                if db[x] > db[v] + w:
-                    # 发现更短的路径
-                    db[x] = db[v] + w
-                    paib[x] = v
+            candidate, x = step(dag.in_adjacent, Sb, Qb, db, paib, df)
+        if candidate < mu:
+            mu, n = candidate, x
+    if n is None:
+        # 证明 s-x->t 路径不存在
+        raise NoPathException('不存在路径 {s}-->{t}'.format(s=s, t=t))
+    return (dag.by_vertex_sparse(df), dag.by_vertex_sparse(db),
+            dag.parent_by_vertex_sparse(paif), dag.parent_by_vertex_sparse(paib), dag.vexes[n])
 
 
-def judge(dag: DirectGraph, df: dict, db: dict, n: Vertex):
+def initialize(si: int, ti: int):
     """
-    判断是否已经找到了最短路径
+    做搜索前 forward backward 的初始化，只初始化源点和目标顶点，其他顶点在第一次访问时才加入 d 和 pai
     :return:
     """
-    return all(df[v] + db[v] >= df[n] + db[n] for v in dag.vertexes)
+    Sf = set()
+    Sb = set()
+    Qf = HeapQueue()
+    Qb = HeapQueue()
+    Qf.push(0, si)
+    Qb.push(0, ti)
+    df = {si: 0}
+    db = {ti: 0}
+    paif = {si: None}
+    paib = {ti: None}
+    return Sf, Sb, Qf, Qb, df, db, paif, paib
 
 
-def initialize(dag: DirectGraph, s: Vertex, t: Vertex):
+def discard(Q: HeapQueue, S: set):
     """
-    做搜索前 forward backward 的初始化
+    弹出堆顶 lazy deletion 留下的过期记录
     :return:
     """
-    Sf = {s}
-    Sb = {t}
-    Qf = set()
-    Qb = set()
-    df = {s: 0}
-    db = {t: 0}
-    paif = {s: None}
-    paib = {t: None}
-    for u in dag.vertexes:
-        if u != s:
-            Qf.add(u)
-            w = dag.get_edge_weight(s, u)
-            df[u] = w
-            if w < sys.maxsize:
-                paif[u] = s
-            else:
-                paif[u] = None
-        if u != t:
-            Qb.add(u)
-            w = dag.get_edge_weight(u, t)
-            db[u] = w
-            if w < sys.maxsize:
-                paib[u] = t
-            else:
-                paib[u] = None
-    return Sf, Sb, Qf, Qb, df, db, paif, paib
+    while Q and Q.top()[1] in S:
+        Q.pop()
+
+
+def step(adjacent, S: set, Q: HeapQueue, d: dict, pai: dict, other: dict):
+    """
+    某一方向的搜索前进一步：从 Q 中弹出距离最小的顶点 v，relax 与 v 相连的所有边
+    forward 时 adjacent 为出边，backward 时 adjacent 为入边，relax 的方式相同
+    :param adjacent: 返回某顶点相连的边 (顶点 id, 权重)
+    :param S: 本方向已经确定最短路径的顶点
+    :param Q: 本方向的优先队列
+    :param d: 本方向的距离
+    :param pai: 本方向最短路径中的上一个顶点
+    :param other: 另一方向的距离
+    :return: 本次找到的最短 s-->t 路径长度以及该路径上两个方向相遇的顶点，没有找到时为 sys.maxsize, None
+    """
+    dv, v = Q.pop()
+    S.add(v)
+    mu, n = sys.maxsize, None
+    if v in other and dv + other[v] < mu:
+        mu, n = dv + other[v], v
+    for x, w in adjacent(v):
+        if x not in d or d[x] > dv + w:
+            d[x] = dv + w
+            pai[x] = v
+            Q.push(d[x], x)
+        if x in other and d[x] + other[x] < mu:
+            mu, n = d[x] + other[x], x
+    return mu, n
+
+
+def stitch_path(paif: dict, paib: dict, n) -> list:
+    """
+    拼接 s-->n 与 n-->t 两段路径
+    :param paif: 正向搜索中每个顶点的上一个顶点
+    :param paib: 反向搜索中每个顶点在 -->t 路径上的下一个顶点
+    :param n: 两个方向的搜索相遇的顶点
+    :return: [s, ..., n, ..., t]
+    """
+    path = []
+    v = n
+    while v is not None:
+        path.append(v)
+        v = paif[v]
+    path.reverse()
+    v = paib[n]
+    while v is not None:
+        path.append(v)
+        v = paib[v]
+    return path
 
 
 def print_shortest_path(paif: dict, paib: dict, n: Vertex):
@@ -207,6 +200,8 @@ def test():
         print('paif: ', paif)
         print('paib ', paib)
         print_shortest_path(paif, paib, n)
+        print()
+        print(stitch_path(paif, paib, n))
     except NoPathException as e:
         print(e)
 
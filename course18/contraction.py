@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# author: Xiguang Liu<g10guang@foxmail.com>
+# 2026-10-17
+# Contraction Hierarchies（CH）：对静态图做一次预处理，之后的点对点最短路径查询只需要访问很少的顶点
+# 预处理：
+# 1. 按照优先级依次 contract 顶点，优先级 = edge difference（需要添加的 shortcut 数量 - 被删除的边数量）+ 已经被 contract 的邻居数量
+# 2. contract 顶点 v 时，对于每一对 u-->v-->w，如果在不经过 v 的剩余图中找不到不长于 u-->v-->w 的路径（witness），
+#    就添加 shortcut u-->w，权重为 w(u, v) + w(v, w)，并记录中间顶点 v，用于之后展开路径
+# 3. 顶点被 contract 的顺序即为它的 rank，所有边（包括 shortcut）分为 rank 上升的 upward 边和 rank 下降的 downward 边
+# 查询：从 s 沿 upward 边做 forward search，从 t 沿反向的 downward 边做 backward search，两者都只往 rank 更高的顶点走
+# 当两个方向堆顶的较小值 >= mu 时停止，mu 即为最短路径长度，最后通过 shortcut 的中间顶点展开得到完整路径
+import heapq
+import pickle
+import sys
+from array import array
+
+from course13.graph import DirectGraph, Vertex
+from course18.bi_dijkstra import discard, initialize, step, stitch_path
+
+INF = float('inf')
+
+
+class ContractionHierarchy(object):
+    """
+    预处理后的 contraction hierarchy
+    upward 边：顶点 i 的边为 up_targets[up_offsets[i]:up_offsets[i + 1]]，只指向 rank 更高的顶点
+    downward 边按照终点反向存储：顶点 i 的边为 down_sources[down_offsets[i]:down_offsets[i + 1]]，代表 rank 更高的顶点到 i 的边
+    middle[(u, w)] 为 shortcut u-->w 的中间顶点
+    顶点通过 value 对应，所以保存到磁盘后可以由相同顶点构建的图加载
+    """
+
+    def __init__(self, values: list, rank: list, up: tuple, down: tuple, middle: dict) -> None:
+        super().__init__()
+        self.values = values
+        self.rank = rank
+        self.up_offsets, self.up_targets, self.up_weights = up
+        self.down_offsets, self.down_sources, self.down_weights = down
+        self.middle = middle
+        self.ids = {Vertex(value): i for i, value in enumerate(values)}
+
+    @classmethod
+    def build(cls, g: DirectGraph, witness_limit: int = 64):
+        """
+        预处理，构建 contraction hierarchy
+        :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph，假设不存在 negative weight edge
+        :param witness_limit: witness search 最多确定的顶点数量，超过后认为不存在 witness，只会多添加 shortcut，不影响正确性
+        :return:
+        """
+        vexnum = g.get_vertex_num()
+        # out[u][w] = (权重, shortcut 的中间顶点或者 None)，inc[w][u] = 权重，两个顶点之间只保留最小的权重
+        out = [{} for _ in range(vexnum)]
+        inc = [{} for _ in range(vexnum)]
+        for u in range(vexnum):
+            for w, weight in g.adjacent(u):
+                if w != u and (w not in out[u] or weight < out[u][w][0]):
+                    out[u][w] = (weight, None)
+                    inc[w][u] = weight
+        contracted = [False] * vexnum
+        deleted = [0] * vexnum
+        rank = [0] * vexnum
+
+        def shortcuts(v):
+            """
+            contract v 需要添加的 shortcut，以及 v 在剩余图中的边数
+            """
+            ins = [(u, weight) for u, weight in inc[v].items() if not contracted[u]]
+            outs = [(w, weight) for w, (weight, m) in out[v].items() if not contracted[w]]
+            result = []
+            if outs:
+                max_out = max(weight for w, weight in outs)
+                for u, wu in ins:
+                    dist = witness(u, v, wu + max_out)
+                    for w, ww in outs:
+                        if w != u and dist.get(w, INF) > wu + ww:
+                            result.append((u, w, wu + ww))
+            return result, len(ins) + len(outs)
+
+        def witness(u, v, limit):
+            """
+            在剩余图中不经过 v，从 u 出发的局部 Dijkstra，距离超过 limit 后停止
+            """
+            dist = {u: 0}
+            heap = [(0, u)]
+            settled = 0
+            while heap and settled < witness_limit:
+                dx, x = heapq.heappop(heap)
+                if dx > dist[x]:
+                    continue
+                if dx > limit:
+                    break
+                settled += 1
+                for y, (weight, m) in out[x].items():
+                    if y != v and not contracted[y] and dx + weight < dist.get(y, INF):
+                        dist[y] = dx + weight
+                        heapq.heappush(heap, (dist[y], y))
+            return dist
+
+        def priority(v):
+            added, removed = shortcuts(v)
+            return len(added) - removed + deleted[v], added
+
+        heap = [(priority(v)[0], v) for v in range(vexnum)]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            p, v = heapq.heappop(heap)
+            # lazy update：重新计算优先级，如果已经不是最小的，放回堆中
+            p, added = priority(v)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+            for u, w, weight in added:
+                if w not in out[u] or weight < out[u][w][0]:
+                    out[u][w] = (weight, v)
+                    inc[w][u] = weight
+            for x in list(inc[v]) + list(out[v]):
+                if not contracted[x]:
+                    deleted[x] += 1
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+        up = [[] for _ in range(vexnum)]
+        down = [[] for _ in range(vexnum)]
+        middle = {}
+        for u in range(vexnum):
+            for w, (weight, m) in out[u].items():
+                if m is not None:
+                    middle[(u, w)] = m
+                if rank[w] > rank[u]:
+                    up[u].append((w, weight))
+                else:
+                    down[w].append((u, weight))
+        return cls([v.value for v in g.vexes], rank, pack(up), pack(down), middle)
+
+    def upward(self, i: int):
+        """
+        forward search 中顶点 i 的出边
+        """
+        start, end = self.up_offsets[i], self.up_offsets[i + 1]
+        return zip(self.up_targets[start:end], self.up_weights[start:end])
+
+    def downward(self, i: int):
+        """
+        backward search 中顶点 i 的入边
+        """
+        start, end = self.down_offsets[i], self.down_offsets[i + 1]
+        return zip(self.down_sources[start:end], self.down_weights[start:end])
+
+    def query(self, s: Vertex, t: Vertex):
+        """
+        求 s-->t 的最短路径
+        :param s: 源点
+        :param t: 目标顶点
+        :return: s-->t 的最短路径长度以及路径上的顶点 [s, ..., t]，不存在路径时返回 sys.maxsize, []
+        """
+        si, ti = self.ids[s], self.ids[t]
+        Sf, Sb, Qf, Qb, df, db, paif, paib = initialize(si, ti)
+        mu = 0 if si == ti else sys.maxsize
+        n = si if si == ti else None
+        while Qf or Qb:
+            discard(Qf, Sf)
+            discard(Qb, Sb)
+            topf = Qf.top()[0] if Qf else INF
+            topb = Qb.top()[0] if Qb else INF
+            # 两个方向都只往 rank 更高的顶点走，不能使用 topf + topb >= mu 的停止条件
+            if min(topf, topb) >= mu:
+                break
+            if topf <= topb:
+                candidate, x = step(self.upward, Sf, Qf, df, paif, db)
+            else:
+                candidate, x = step(self.downward, Sb, Qb, db, paib, df)
+            if candidate < mu:
+                mu, n = candidate, x
+        if n is None:
+            return sys.maxsize, []
+        path = self.unpack(stitch_path(paif, paib, n))
+        return mu, [Vertex(self.values[i]) for i in path]
+
+    def unpack(self, path: list) -> list:
+        """
+        将路径中的 shortcut 展开为原图中的边
+        :param path: 包含 shortcut 的路径，顶点 id
+        :return: 原图中的路径，顶点 id
+        """
+        if not path:
+            return []
+        result = [path[0]]
+        # 栈中为尚未展开的边，栈顶为路径中下一条边
+        stack = list(zip(path, path[1:]))[::-1]
+        while stack:
+            u, w = stack.pop()
+            m = self.middle.get((u, w))
+            if m is None:
+                result.append(w)
+            else:
+                stack.append((m, w))
+                stack.append((u, m))
+        return result
+
+    def save(self, path: str):
+        """
+        保存到磁盘
+        :param path:
+        :return:
+        """
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'values': self.values,
+                'rank': self.rank,
+                'up': (self.up_offsets, self.up_targets, self.up_weights),
+                'down': (self.down_offsets, self.down_sources, self.down_weights),
+                'middle': self.middle,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        从磁盘加载
+        :param path:
+        :return:
+        """
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        return cls(data['values'], data['rank'], data['up'], data['down'], data['middle'])
+
+
+def pack(adj: list) -> tuple:
+    """
+    将邻接链表压缩为 CSR 形式的 (offsets, 顶点, 权重)
+    :param adj: adj[i] 为 [(顶点 id, 权重)]
+    :return:
+    """
+    offsets = array('q', [0])
+    vexes = array('q')
+    weights = []
+    for pairs in adj:
+        for v, weight in pairs:
+            vexes.append(v)
+            weights.append(weight)
+        offsets.append(len(vexes))
+    typecode = 'q' if all(isinstance(w, int) for w in weights) else 'd'
+    return offsets, vexes, array(typecode, weights)
+
+
+def test():
+    import os
+    import tempfile
+    dg = DirectGraph()
+    a = Vertex('a')
+    b = Vertex('b')
+    c = Vertex('c')
+    d = Vertex('d')
+    e = Vertex('e')
+    f = Vertex('f')
+    g = Vertex('g')
+    h = Vertex('h')
+    dg.add_vertex(a)
+    dg.add_vertex(b)
+    dg.add_vertex(c)
+    dg.add_vertex(d)
+    dg.add_vertex(e)
+    dg.add_vertex(f)
+    dg.add_vertex(g)
+    dg.add_vertex(h)
+    dg.add_edge(a, b, 2)
+    dg.add_edge(d, a, 3)
+    dg.add_edge(b, c, 3)
+    dg.add_edge(c, d, 5)
+    dg.add_edge(c, e, 6)
+    dg.add_edge(c, f, 4)
+    dg.add_edge(g, e, 1)
+    dg.add_edge(f, g, 2)
+    dg.add_edge(b, e, 2)
+    dg.add_edge(e, g, 3)
+    dg.add_edge(g, c, 3)
+
+    ch = ContractionHierarchy.build(dg)
+    path = os.path.join(tempfile.gettempdir(), 'contraction.pkl')
+    ch.save(path)
+    ch = ContractionHierarchy.load(path)
+    os.remove(path)
+    print('rank: ', ch.rank)
+    print('shortcuts: ', ch.middle)
+    print(ch.query(g, a))
+    print(ch.query(a, h))
+
+
+if __name__ == '__main__':
+    test()
@@ -7,52 +7,524 @@
 # Floyd 算法的思想：从图中编号为 0 的顶点开始，直到遍历所有的顶点，初始 vi --> vj 的最短路径长度为 d(vi, vj)
 # 每加入一个新的顶点 vx，就判断 vi-->...-->vx + vx-->...-->vj 路径长度比原来的 d(vi, vj) 更小，如果是则更新
 # d(vi, vj) = d(vi, vx) + d(vx, vj)
+# 路径使用 next-hop 矩阵记录：nxt[i][j] 为 vi-->vj 的最短路径上 vi 之后的第一个顶点，只需要 V^2 的空间，
+# 更新 d(vi, vj) 时 nxt[i][j] = nxt[i][x]，求路径时从 vi 开始沿着 nxt[.][j] 走到 vj
+# NumPy 版本：第 x 次循环一次性更新整个矩阵 d = min(d, d[:, x, None] + d[None, x, :])
+# 分块（blocked）版本：将矩阵分为 b * b 的块，每一轮取第 kb 个对角块，依次处理
+# 1. 对角块 (kb, kb)；2. 与对角块同行、同列的块；3. 其余的块，只依赖第 1、2 步的结果
+# 每一步只访问少数几个块，块足够小时可以放进 CPU cache
+# Out-of-core 版本：矩阵保存在 np.memmap 文件中，按照相同的顺序逐块读入内存、计算、写回，每一轮结束后记录 checkpoint
+# 并行版本：矩阵保存在 multiprocessing.shared_memory 中，每一轮中第 2 步的块之间、第 3 步的块之间相互独立，分配给进程池并行计算
+import json
+import os
 import sys
 import pprint
-from course13.graph import DirectGraph, Vertex
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from course13.graph import CSRGraph, DirectGraph, Vertex
+from course17.bellman_ford import NegativeCycleException, edge_arrays
+from tools.count_time import count_time
+from tools.mock_data import mock_direct_graph
+
+# 子进程中 attach 的共享内存以及矩阵，由 attach 初始化
+shared = {}
 
 
 def floyd(dag: DirectGraph):
     """
     Floyd 求图中每两个顶点之间的最短路径长度
-    :return:
+    :param dag: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+    :return: d, nxt, vexes，d[i][j] 为 vexes[i]-->vexes[j] 的最短路径长度，不可达为 sys.maxsize，
+             nxt 为 next-hop 矩阵，使用 next_hop_path 求路径
     """
-    d, p, vexes, vexnum = initialize(dag)
-    # pprint.pprint(vexnum)
-    # pprint.pprint(vexes)
-    # pprint.pprint(d)
-    # pprint.pprint(p)
+    if isinstance(dag, CSRGraph):
+        d, nxt, vexes, vexnum = csr_initialize(dag)
+    else:
+        d, nxt, vexes, vexnum = initialize(dag)
     for u in range(vexnum):
+        du = d[u]
         for i in range(vexnum):
+            diu = d[i][u]
+            # sys.maxsize 代表不可达，不能参与计算，否则加上负权重后会小于 sys.maxsize
+            if diu == sys.maxsize:
+                continue
+            di, nxti, nxtiu = d[i], nxt[i], nxt[i][u]
             for j in range(vexnum):
-                if d[i][u] + d[u][j] < d[i][j]:
-                    d[i][j] = d[i][u] + d[u][j]
-                    for k in range(vexnum):
-                        p[i][j][k] = p[i][u][k] or p[u][j][k]
-    return d, p, vexes
+                if du[j] != sys.maxsize and diu + du[j] < di[j]:
+                    di[j] = diu + du[j]
+                    nxti[j] = nxtiu
+    return d, nxt, vexes
 
 
 def initialize(dag: DirectGraph):
     """
     对进行 Floyd 算法求解之前先进行数据的初始化
+    需要对每两个顶点调用 get_edge_weight，图建立了邻居索引（merge 参数）时初始化的时间复杂度为 O(V^2)
     :return:
     """
     vexnum = dag.get_vertex_num()
-    # Graph 中顶点以　set() 集和存储，这里我们需要将其转化为　list，方便使用下标 index 访问，list 中保存的只是引用，根本上还是 Graph 中 set 的顶点
-    vexes = list(dag.vertexes)      # 由于是从 set 转化为 list，所以即使是相同的顶点，生成的 list 每次顶点顺序也可能不一样
-    # 用于记录最短路径的关系的三维数组 p
-    p = [[[False for _ in range(vexnum)] for j in range(vexnum)] for i in range(vexnum)]
+    # 直接使用 Graph 中分配的顶点 id 作为下标，vexes[i] 为 id 为 i 的顶点
+    vexes = list(dag.vexes)
     # 生成用于记录图中每两个顶点之间的最短路径的二维数组 d[i][j] 代表 vi-->vj 的距离
     d = [[dag.get_edge_weight(vexes[i], vexes[j]) if i != j else 0 for j in range(vexnum)] for i in range(vexnum)]
+    nxt = init_next(d)
+    return d, nxt, vexes, vexnum
+
+
+def csr_initialize(g: CSRGraph):
+    """
+    使用 CSR 图初始化，直接按照 id 顺序扫描每条边，不需要对每两个顶点调用 get_edge_weight
+    :return:
+    """
+    vexnum = g.get_vertex_num()
+    vexes = g.vexes
+    d = [[sys.maxsize if i != j else 0 for j in range(vexnum)] for i in range(vexnum)]
     for i in range(vexnum):
-        for j in range(vexnum):
-            if d[i][j] < sys.maxsize:
-                p[i][j][i], p[i][j][j] = True, True
-    return d, p, vexes, vexnum
+        for j, w in g.adjacent(i):
+            # 与 CSRGraph.get_edge_weight 一致，取 i-->j 所有边中最小的权重，原图指定了 merge 策略时 CSR 中只有合并后的一条边
+            if i != j and w < d[i][j]:
+                d[i][j] = w
+    nxt = init_next(d)
+    return d, nxt, vexes, vexnum
+
+
+def init_next(d: list):
+    """
+    初始化 next-hop 矩阵：存在边 vi-->vj 时 nxt[i][j] = j，nxt[i][i] = i，不可达为 None
+    """
+    return [[j if dij < sys.maxsize else None for j, dij in enumerate(di)] for di in d]
+
+
+def next_hop_path(nxt, i: int, j: int) -> list:
+    """
+    根据 next-hop 矩阵求 vi-->vj 的最短路径
+    :param nxt: list 或者 NumPy 矩阵，NumPy 矩阵中不可达为 -1
+    :param i:
+    :param j:
+    :return: 路径上的顶点 id [i, ..., j]，不可达时返回 []
+    """
+    if nxt[i][j] is None or nxt[i][j] < 0:
+        return []
+    path = [i]
+    while i != j:
+        i = int(nxt[i][j])
+        path.append(i)
+    return path
+
+
+class APSP(object):
+    """
+    每两个顶点之间的最短路径
+    dist 为 float64 的 NumPy 距离矩阵，不可达为 inf；nxt 为 int64 的 next-hop 矩阵，不可达为 -1
+    矩阵的下标为顶点在图中的 id，vexes[i] 为 id 为 i 的顶点
+    weights 为图中每条边的权重 {(i, j): w}，用于 decrease_weight 检查边是否存在以及权重是否减小
+    """
+
+    def __init__(self, vexes: list, dist, nxt, weights: dict) -> None:
+        super().__init__()
+        self.vexes = vexes
+        self.ids = {v: i for i, v in enumerate(vexes)}
+        self.dist = dist
+        self.nxt = nxt
+        self.weights = weights
+        # 每次修改的记录 (u, v, w, [(i, j)])，[(i, j)] 为最短路径长度发生变化的顶点对
+        self.log = []
+
+    def distance(self, u: Vertex, v: Vertex):
+        """
+        u-->v 的最短路径长度
+        :return: 不可达时返回 sys.maxsize
+        """
+        x = self.dist[self.ids[u], self.ids[v]]
+        if x == float('inf'):
+            return sys.maxsize
+        return int(x) if x == int(x) else float(x)
+
+    def path(self, u: Vertex, v: Vertex) -> list:
+        """
+        u-->v 的最短路径
+        :return: 路径上的顶点 [u, ..., v]，不可达时返回 []
+        """
+        return [self.vexes[i] for i in next_hop_path(self.nxt, self.ids[u], self.ids[v])]
+
+    def add_edge(self, u: Vertex, v: Vertex, w, band: int = 1024):
+        """
+        图中添加边 u-->v 后增量更新，时间复杂度为 O(V^2)，不需要重新运行 Floyd-Warshall
+        新的最短路径如果经过 u-->v，则为 vi-->...-->u-->v-->...-->vj，所以 d[i][j] = min(d[i][j], d[i][u] + w + d[v][j])
+        不存在 negative-weight cycle 时 d[i][u] 和 d[v][j] 不会因为 u-->v 变小，所以先复制这两个向量，再每次更新 band 行，
+        临时数组为 band * V 而不是 V * V，dist 为 np.memmap 时也不需要把整个矩阵读入内存
+        如果 w + d[v][u] < 0 则 u-->v-->...-->u 为 negative-weight cycle，抛出 NegativeCycleException，不修改矩阵
+        :param u:
+        :param v:
+        :param w: 边的权重
+        :param band: 每次更新的行数
+        :return: 最短路径长度发生变化的顶点对 [(vi, vj)]
+        """
+        import numpy as np
+        ui, vi = self.ids[u], self.ids[v]
+        if w + self.dist[vi, ui] < 0:
+            cycle = [u] + self.path(v, u)[:-1] if u != v else [u]
+            raise NegativeCycleException([(cycle, self.distance(v, u) + w if u != v else w)])
+        to_u = np.array(self.dist[:, ui])
+        from_v = np.array(self.dist[vi, :]) + w
+        # vi-->...-->u-->v-->...-->vj 的第一步为 nxt[i][u]，从 u 出发时第一步为 v
+        hop = np.array(self.nxt[:, ui])
+        hop[ui] = vi
+        changed = []
+        for rows in tiles(len(to_u), band):
+            d = self.dist[rows]
+            candidate = to_u[rows, None] + from_v[None, :]
+            better = candidate < d
+            if not better.any():
+                continue
+            np.copyto(d, candidate, where=better)
+            np.copyto(self.nxt[rows], hop[rows, None], where=better)
+            changed.extend((self.vexes[rows.start + i], self.vexes[j]) for i, j in zip(*np.nonzero(better)))
+        if (ui, vi) not in self.weights or w < self.weights[ui, vi]:
+            self.weights[ui, vi] = w
+        self.log.append((u, v, w, changed))
+        return changed
+
+    def decrease_weight(self, u: Vertex, v: Vertex, w, band: int = 1024):
+        """
+        边 u-->v 的权重减小为 w 后增量更新，等价于添加一条权重为 w 的平行边
+        权重增大时原来的最短路径可能失效，只能重新计算
+        :param u:
+        :param v:
+        :param w: 新的权重
+        :param band: 每次更新的行数
+        :return: 最短路径长度发生变化的顶点对 [(vi, vj)]，边不存在或者 w 没有小于原来的权重时抛出 ValueError
+        """
+        key = self.ids[u], self.ids[v]
+        if key not in self.weights:
+            raise ValueError('边 {}-->{} 不在图中'.format(u, v))
+        if w >= self.weights[key]:
+            raise ValueError('边 {}-->{} 的新权重 {} 没有小于原来的权重 {}，权重增大时需要重新计算'.format(
+                u, v, w, self.weights[key]))
+        return self.add_edge(u, v, w, band)
+
+
+def floyd_warshall(g: DirectGraph, block_size: int = None) -> APSP:
+    """
+    使用 NumPy 向量化的 Floyd-Warshall 求图中每两个顶点之间的最短路径
+    两个顶点之间有多条边时取最小的权重，整数权重在 2^53 以内时结果是精确的
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+    :param block_size: 为 None 时每次循环更新整个矩阵；否则使用 block_size * block_size 的分块版本
+    :return: APSP，存在 negative-weight cycle 时抛出 NegativeCycleException
+    """
+    d, nxt = matrix_initialize(g)
+    n = g.get_vertex_num()
+    if block_size is None:
+        relax_tile(d, nxt, d, nxt, d)
+    else:
+        blocked(d, nxt, block_size)
+    if n and d.diagonal().min() < 0:
+        raise NegativeCycleException()
+    return APSP(list(g.vexes), d, nxt, edge_weights(g))
+
+
+def matrix_initialize(g: DirectGraph):
+    """
+    初始化 NumPy 距离矩阵和 next-hop 矩阵
+    :return: d, nxt
+    """
+    import numpy as np
+    n = g.get_vertex_num()
+    src, dst, w = edge_arrays(g)
+    d = np.full((n, n), np.inf)
+    np.fill_diagonal(d, 0)
+    # 按照 (src, dst) 取所有平行边中的最小权重，负权重的自环使对角线小于 0
+    np.minimum.at(d, (src, dst), w)
+    nxt = np.where(np.isfinite(d), np.arange(n, dtype=np.int64)[None, :], -1)
+    return d, nxt
+
+
+def edge_weights(g: DirectGraph) -> dict:
+    """
+    图中每条边的权重，两个顶点之间有多条边时取最小的权重，与 matrix_initialize 一致
+    :return: {(i, j): w}
+    """
+    weights = {}
+    for u in range(g.get_vertex_num()):
+        for v, w in g.adjacent(u):
+            if (u, v) not in weights or w < weights[u, v]:
+                weights[u, v] = w
+    return weights
+
+
+def relax_tile(c, nc, a, na, b):
+    """
+    依次经过中间顶点 K 中的每个顶点 k，更新 c = min(c, a[:, k] + b[k, :])，c 为 d[I, J]，a 为 d[I, K]，b 为 d[K, J]
+    a、b 可以与 c 是同一个块（对角块、同行同列的块），此时与原始的 Floyd-Warshall 一样原地更新
+    :param c: 被更新的距离块
+    :param nc: c 对应的 next-hop 块
+    :param a: d[I, K]
+    :param na: a 对应的 next-hop 块，vi-->vk 的第一步也是经过 vk 后 vi-->vj 的第一步
+    :param b: d[K, J]
+    :return:
+    """
+    import numpy as np
+    for k in range(a.shape[1]):
+        candidate = a[:, k, None] + b[None, k, :]
+        better = candidate < c
+        np.copyto(c, candidate, where=better)
+        np.copyto(nc, na[:, k, None], where=better)
+
+
+def tiles(n: int, b: int):
+    """
+    将 [0, n) 分为长度为 b 的区间
+    """
+    return [slice(i, min(i + b, n)) for i in range(0, n, b)]
+
+
+def blocked(d, nxt, b: int):
+    """
+    分块的 Floyd-Warshall，直接在矩阵的 view 上原地更新
+    :param d: 距离矩阵，原地更新
+    :param nxt: next-hop 矩阵，原地更新
+    :param b: 块的大小
+    :return:
+    """
+    blocks = tiles(len(d), b)
+    for kb in blocks:
+        blocked_round(lambda rows, cols: (d[rows, cols], nxt[rows, cols]), lambda rows, cols, c, nc: None, blocks, kb)
+
+
+def blocked_round(load, store, blocks: list, kb: slice):
+    """
+    分块 Floyd-Warshall 的一轮：对角块，同行、同列的块，其余的块
+    :param load: load(rows, cols) 返回 (距离块, next-hop 块)
+    :param store: store(rows, cols, 距离块, next-hop 块) 保存被更新的块，块为 view 时可以什么都不做
+    :param blocks: 所有的区间
+    :param kb: 本轮的对角块
+    :return:
+    """
+    diag, ndiag = load(kb, kb)
+    relax_tile(diag, ndiag, diag, ndiag, diag)
+    store(kb, kb, diag, ndiag)
+    for other in blocks:
+        if other == kb:
+            continue
+        c, nc = load(kb, other)
+        relax_tile(c, nc, diag, ndiag, c)
+        store(kb, other, c, nc)
+        c, nc = load(other, kb)
+        relax_tile(c, nc, c, nc, diag)
+        store(other, kb, c, nc)
+    for rows in blocks:
+        if rows == kb:
+            continue
+        a, na = load(rows, kb)
+        for cols in blocks:
+            if cols == kb:
+                continue
+            b, _ = load(kb, cols)
+            c, nc = load(rows, cols)
+            relax_tile(c, nc, a, na, b)
+            store(rows, cols, c, nc)
+
+
+def floyd_warshall_file(g: DirectGraph, path: str, block_size: int = 1024) -> APSP:
+    """
+    Out-of-core 的分块 Floyd-Warshall，距离矩阵和 next-hop 矩阵保存在 np.memmap 文件中，适用于内存放不下 V^2 矩阵的图
+    每次只把少数几个块复制到内存中计算，再写回文件
+    文件：path 为 float64 的距离矩阵，path + '.next' 为 int32 的 next-hop 矩阵，path + '.checkpoint' 记录已经完成的轮数
+    每一轮结束后 flush 两个矩阵再更新 checkpoint，中途崩溃后使用相同的参数再次调用即从最后一次 checkpoint 继续：
+    矩阵中的值始终是某条真实路径的长度，并且不大于初始值，所以重新执行中断的那一轮不影响正确性；
+    写回时先写 next-hop 块再写距离块，中断时距离仍为旧值的元素在重新执行时一定会再次被更新，next-hop 也随之被覆盖
+    继续计算时假设图没有变化
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+    :param path: 距离矩阵文件
+    :param block_size: 块的大小，同时在内存中的大约为 6 个块
+    :return: APSP，dist 和 nxt 为 np.memmap，存在 negative-weight cycle 时抛出 NegativeCycleException
+    """
+    import numpy as np
+    n = g.get_vertex_num()
+    blocks = tiles(n, block_size)
+    done = read_checkpoint(path, n, block_size)
+    if done is None:
+        dist = np.memmap(path, dtype=np.float64, mode='w+', shape=(n, n))
+        nxt = np.memmap(path + '.next', dtype=np.int32, mode='w+', shape=(n, n))
+        file_initialize(g, dist, nxt, block_size)
+        done = 0
+        write_checkpoint(path, n, block_size, done)
+    else:
+        dist = np.memmap(path, dtype=np.float64, mode='r+', shape=(n, n))
+        nxt = np.memmap(path + '.next', dtype=np.int32, mode='r+', shape=(n, n))
+
+    def load(rows, cols):
+        return np.array(dist[rows, cols]), np.array(nxt[rows, cols])
+
+    def store(rows, cols, c, nc):
+        nxt[rows, cols] = nc
+        dist[rows, cols] = c
+
+    for r in range(done, len(blocks)):
+        blocked_round(load, store, blocks, blocks[r])
+        nxt.flush()
+        dist.flush()
+        write_checkpoint(path, n, block_size, r + 1)
+    if n and dist.diagonal().min() < 0:
+        raise NegativeCycleException()
+    return APSP(list(g.vexes), dist, nxt, edge_weights(g))
+
+
+def file_initialize(g: DirectGraph, dist, nxt, block_size: int):
+    """
+    按照每 block_size 行一批初始化文件中的矩阵，不需要在内存中构建完整的矩阵
+    """
+    import numpy as np
+    n = len(dist)
+    src, dst, w = edge_arrays(g)
+    order = np.argsort(src, kind='stable')
+    src, dst, w = src[order], dst[order], w[order]
+    for rows in tiles(n, block_size):
+        band = np.full((rows.stop - rows.start, n), np.inf)
+        band[np.arange(len(band)), np.arange(rows.start, rows.stop)] = 0
+        lo, hi = np.searchsorted(src, [rows.start, rows.stop])
+        np.minimum.at(band, (src[lo:hi] - rows.start, dst[lo:hi]), w[lo:hi])
+        dist[rows] = band
+        nxt[rows] = np.where(np.isfinite(band), np.arange(n, dtype=np.int32)[None, :], -1)
+    nxt.flush()
+    dist.flush()
+
+
+def read_checkpoint(path: str, n: int, block_size: int):
+    """
+    读取 checkpoint
+    :return: 已经完成的轮数，不存在 checkpoint 或者参数不一致时返回 None
+    """
+    try:
+        with open(path + '.checkpoint') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get('vexnum') != n or checkpoint.get('block_size') != block_size:
+        return None
+    if not os.path.exists(path) or not os.path.exists(path + '.next'):
+        return None
+    return checkpoint['done']
+
+
+def write_checkpoint(path: str, n: int, block_size: int, done: int):
+    """
+    写入 checkpoint，先写临时文件再 rename，保证 checkpoint 文件总是完整的
+    """
+    tmp = path + '.checkpoint.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'vexnum': n, 'block_size': block_size, 'done': done}, f)
+    os.replace(tmp, path + '.checkpoint')
+
+
+def parallel_floyd_warshall(g: DirectGraph, block_size: int = 256, workers: int = None) -> APSP:
+    """
+    并行的分块 Floyd-Warshall，距离矩阵和 next-hop 矩阵保存在共享内存中，子进程直接在共享内存上原地更新
+    每一轮先由当前进程计算对角块，再并行计算同行、同列的块，最后并行计算其余的块，每一步之间需要等待上一步全部完成
+    每一轮的任务数为 (V / block_size)^2，block_size 越小并行度越高，但任务调度的开销越大
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+    :param block_size: 块的大小
+    :param workers: 进程数，为 None 时使用 CPU 核数
+    :return: APSP，存在 negative-weight cycle 时抛出 NegativeCycleException
+    """
+    import numpy as np
+    d, nxt = matrix_initialize(g)
+    n = len(d)
+    blocks = [share_matrix(d), share_matrix(nxt)]
+    try:
+        specs = [(block.name, m.dtype.str, m.shape) for block, m in zip(blocks, (d, nxt))]
+        attach(specs)
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach, initargs=(specs,)) as pool:
+            spans = [(b.start, b.stop) for b in tiles(n, block_size)]
+            for kb in spans:
+                tile_task(kb, kb, kb)
+                others = [other for other in spans if other != kb]
+                wait_all(pool, [(kb, other, kb) for other in others] + [(other, kb, kb) for other in others])
+                wait_all(pool, [(rows, cols, kb) for rows in others for cols in others])
+        d, nxt = np.array(shared['d']), np.array(shared['nxt'])
+    finally:
+        shared.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+    if n and d.diagonal().min() < 0:
+        raise NegativeCycleException()
+    return APSP(list(g.vexes), d, nxt, edge_weights(g))
+
+
+def share_matrix(m) -> shared_memory.SharedMemory:
+    """
+    将 NumPy 矩阵复制到新建的共享内存中
+    """
+    # 不能创建大小为 0 的共享内存
+    block = shared_memory.SharedMemory(create=True, size=max(m.nbytes, 1))
+    block.buf[:m.nbytes] = m.tobytes()
+    return block
+
+
+def attach(specs: list):
+    """
+    子进程的 initializer，attach 共享内存中的距离矩阵和 next-hop 矩阵
+    :param specs: [(共享内存名称, dtype, shape)]，依次为距离矩阵、next-hop 矩阵
+    :return:
+    """
+    import numpy as np
+    blocks = [shared_memory.SharedMemory(name=name) for name, dtype, shape in specs]
+    shared['blocks'] = blocks
+    shared['d'], shared['nxt'] = [np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                                  for block, (name, dtype, shape) in zip(blocks, specs)]
+
+
+def wait_all(pool: ProcessPoolExecutor, tasks: list):
+    """
+    并行执行一步中的所有块，等待全部完成，子进程中的异常在这里抛出
+    """
+    for future in [pool.submit(tile_task, *task) for task in tasks]:
+        future.result()
+
+
+def tile_task(rows: tuple, cols: tuple, kb: tuple):
+    """
+    使用第 kb 轮的中间顶点更新共享内存中的块 (rows, cols)，对角块、同行同列的块以及其余的块都可以用这一个公式表示
+    :param rows: 行的范围 (start, stop)
+    :param cols: 列的范围 (start, stop)
+    :param kb: 中间顶点的范围 (start, stop)
+    :return:
+    """
+    d, nxt = shared['d'], shared['nxt']
+    rows, cols, ks = slice(*rows), slice(*cols), slice(*kb)
+    relax_tile(d[rows, cols], nxt[rows, cols], d[rows, ks], nxt[rows, ks], d[ks, cols])
+
+
+def benchmark_floyd(sizes=(500, 1000, 2000), edge_factor=8, block_size=256, workers=None, triple_loop_limit=1000):
+    """
+    比较原始的三重循环、NumPy 向量化、分块以及并行分块的 Floyd-Warshall
+    三重循环的时间为 O(V^3) 次 Python 操作，实测 V = 200 时约 0.6s，V = 400 时约 4.5s，V = 1000 时约 75s，V = 2000 时约 10 分钟，
+    超过 triple_loop_limit 的规模跳过，默认运行到 V = 1000，V = 2000 需要显式指定 triple_loop_limit=2000
+    :return:
+    """
+    for vexnum in sizes:
+        # 使用 merge='min' 建立邻居索引，三重循环初始化时 get_edge_weight 为 O(1)
+        dg, vexes = mock_direct_graph(vexnum, vexnum * edge_factor, merge='min')
+        print('V = {}, E = {}'.format(vexnum, vexnum * edge_factor))
+        expect = None
+        if vexnum <= triple_loop_limit:
+            print('triple loop', end=' ')
+            expect = count_time(floyd)(dg)[0]
+        print('vectorized', end=' ')
+        result = count_time(floyd_warshall)(dg)
+        print('blocked', end=' ')
+        blocked_result = count_time(floyd_warshall)(dg, block_size)
+        print('parallel', end=' ')
+        parallel_result = count_time(parallel_floyd_warshall)(dg, block_size, workers)
+        if not ((result.dist == blocked_result.dist).all() and (result.dist == parallel_result.dist).all()):
+            print('算法设计失败')
+        if expect is not None and [[result.distance(u, v) for v in vexes] for u in vexes] != expect:
+            print('算法设计失败')
 
 
 def test_floyd():
-    dag = DirectGraph()
+    dag = DirectGraph(merge='min')
     a = Vertex('a')
     b = Vertex('b')
     c = Vertex('c')
@@ -80,10 +552,44 @@ def test_floyd():
     dag.add_edge(b, e, 2)
     dag.add_edge(e, g, 3)
     dag.add_edge(g, c, 3)
-    d, p, vexes = floyd(dag)
+    # 两个顶点之间的多条边，按照 merge='min' 取最小的权重，CSRGraph 与原图一致
+    dag.add_edge(c, d, 1)
+    print(dag.get_edge_weight(c, d), CSRGraph(dag).get_edge_weight(c, d))
+    d, nxt, vexes = floyd(dag)
     pprint.pprint(vexes)
     pprint.pprint(d)
-    pprint.pprint(p)
+    pprint.pprint(nxt)
+    print(floyd(CSRGraph(dag))[0] == d)
+    print([vexes[i] for i in next_hop_path(nxt, 0, 6)])
+    apsp = floyd_warshall(dag)
+    print(apsp.distance(a, g), apsp.path(a, g), apsp.path(g, a))
+    print(apsp.add_edge(a, g, 4), apsp.path(a, e))
+    print(apsp.decrease_weight(g, c, 1), apsp.log)
+    for u, v, w in ((g, a, 2), (g, c, 1)):
+        try:
+            apsp.decrease_weight(u, v, w)
+        except ValueError as exception:
+            print(exception)
+    try:
+        apsp.add_edge(e, a, -10)
+    except NegativeCycleException as exception:
+        print(exception.cycles)
+    apsp = floyd_warshall(dag)
+    blocked_apsp = floyd_warshall(CSRGraph(dag), block_size=3)
+    print((blocked_apsp.dist == apsp.dist).all(), (blocked_apsp.nxt == apsp.nxt).all())
+    import tempfile
+    path = os.path.join(tempfile.gettempdir(), 'floyd.bin')
+    file_apsp = floyd_warshall_file(dag, path, block_size=3)
+    print((file_apsp.dist == apsp.dist).all(), file_apsp.path(a, g))
+    # 模拟在第 2 轮中崩溃，从 checkpoint 继续
+    write_checkpoint(path, len(vexes), 3, 1)
+    file_apsp = floyd_warshall_file(dag, path, block_size=3)
+    print((file_apsp.dist == apsp.dist).all(), file_apsp.path(a, g))
+    del file_apsp
+    for name in (path, path + '.next', path + '.checkpoint'):
+        os.remove(name)
+    parallel_apsp = parallel_floyd_warshall(dag, block_size=3, workers=2)
+    print((parallel_apsp.dist == apsp.dist).all(), (parallel_apsp.nxt == apsp.nxt).all())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# author: Xiguang Liu<g10guang@foxmail.com>
+# 2026-10-17
+# 使用 Johnson 算法求每两个顶点之间的最短路径，适用于稀疏图，时间复杂度为 O(VElogV)，不需要 Floyd 的 V^2 以外的空间
+# 1. 添加一个虚拟源点，到每个顶点有一条权重为 0 的边，使用 Bellman-Ford 求出虚拟源点到每个顶点的距离 h(v)
+#    如果存在 negative-weight cycle 则抛出 course17.bellman_ford.NegativeCycleException
+# 2. 重新赋权 w'(u, v) = w(u, v) + h(u) - h(v)，由三角不等式 h(v) <= h(u) + w(u, v) 可知 w' >= 0，并且不改变最短路径
+# 3. 从每个顶点出发在重新赋权的图上执行 Dijkstra，d(u, v) = d'(u, v) - h(u) + h(v)
+# 第 3 步的 V 次 Dijkstra 相互独立，分配给进程池并行执行：
+# 重新赋权后的 CSR 数组放在 multiprocessing.shared_memory 中，每个进程启动时只 attach 一次，不需要为每个任务序列化整个图
+# 结果按照源点 id 的顺序逐行返回，可以边计算边消费，也可以写入内存映射的距离矩阵文件
+import heapq
+import mmap
+import os
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from course13.graph import DirectGraph, Vertex
+from course17.bellman_ford import super_source
+
+INF = float('inf')
+
+# 子进程中 attach 的共享内存以及 CSR 数组，由 attach 初始化
+shared = {}
+
+
+def johnson(g: DirectGraph, workers: int = None, chunk_size: int = 64):
+    """
+    Johnson 求图中每两个顶点之间的最短路径长度
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph，允许存在 negative weight edge
+    :param workers: 进程数，为 None 时使用 CPU 核数
+    :param chunk_size: 每个任务包含的源点数量
+    :return: d, vexes，d[i][j] 为 vexes[i]-->vexes[j] 的最短路径长度，不可达为 sys.maxsize
+    """
+    d = [None] * g.get_vertex_num()
+    for si, row in johnson_rows(g, workers, chunk_size):
+        d[si] = row
+    return d, list(g.vexes)
+
+
+def johnson_to_file(g: DirectGraph, path: str, workers: int = None, chunk_size: int = 64):
+    """
+    Johnson 求图中每两个顶点之间的最短路径长度，结果逐行写入内存映射文件，内存中只保留正在计算的行
+    文件为 V * V 个按行存储的 float64，第 i 行第 j 个为 vexes[i]-->vexes[j] 的最短路径长度，不可达为 inf，
+    可以使用 array('d') 或者 numpy.memmap(path, dtype='float64', shape=(V, V)) 读取
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph，允许存在 negative weight edge
+    :param path: 距离矩阵文件
+    :param workers: 进程数，为 None 时使用 CPU 核数
+    :param chunk_size: 每个任务包含的源点数量
+    :return: vexes，矩阵的下标与 vexes 的下标对应
+    """
+    vexnum = g.get_vertex_num()
+    with open(path, 'wb+') as f:
+        if vexnum == 0:
+            return []
+        f.truncate(vexnum * vexnum * 8)
+        with mmap.mmap(f.fileno(), vexnum * vexnum * 8) as mm:
+            matrix = memoryview(mm).cast('d')
+            for si, row in johnson_rows(g, workers, chunk_size):
+                matrix[si * vexnum:(si + 1) * vexnum] = array('d', (x if x != sys.maxsize else INF for x in row))
+            matrix.release()
+    return list(g.vexes)
+
+
+def johnson_rows(g: DirectGraph, workers: int = None, chunk_size: int = 64):
+    """
+    Johnson 的生成器版本，按照源点 id 的顺序逐行返回结果
+    同时提交的任务数量有上限，消费者处理较慢时不会在内存中堆积结果
+    :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph，允许存在 negative weight edge
+    :param workers: 进程数，为 None 时使用 CPU 核数
+    :param chunk_size: 每个任务包含的源点数量
+    :return: 生成 (源点 id, 以顶点 id 为下标的最短路径长度 list)
+    """
+    vexnum = g.get_vertex_num()
+    if vexnum == 0:
+        return
+    h = super_source(g)
+    workers = workers or os.cpu_count() or 1
+    arrays = reweight(g, h)
+    blocks = [share(a) for a in arrays]
+    try:
+        specs = [(block.name, a.typecode, len(a)) for block, a in zip(blocks, arrays)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach, initargs=(specs, h)) as pool:
+            chunks = (range(i, min(i + chunk_size, vexnum)) for i in range(0, vexnum, chunk_size))
+            # 最多同时提交 2 * workers 个任务，按照提交的顺序取回结果
+            window = 2 * workers
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(dijkstra_rows, chunk))
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def reweight(g: DirectGraph, h: list):
+    """
+    按照 w'(u, v) = w(u, v) + h(u) - h(v) 重新赋权，并压缩为 CSR 数组
+    :param g:
+    :param h: 虚拟源点到每个顶点的距离
+    :return: offsets, targets, weights
+    """
+    offsets = array('q', [0])
+    targets = array('q')
+    weights = []
+    for u in range(g.get_vertex_num()):
+        for v, w in g.adjacent(u):
+            targets.append(v)
+            # 浮点数的舍入误差可能得到很小的负数
+            weights.append(max(w + h[u] - h[v], 0))
+        offsets.append(len(targets))
+    typecode = 'q' if all(isinstance(w, int) for w in weights) else 'd'
+    return offsets, targets, array(typecode, weights)
+
+
+def share(a: array) -> shared_memory.SharedMemory:
+    """
+    将 array 复制到新建的共享内存中
+    """
+    # 不能创建大小为 0 的共享内存
+    block = shared_memory.SharedMemory(create=True, size=max(len(a) * a.itemsize, a.itemsize))
+    block.buf[:len(a) * a.itemsize] = a.tobytes()
+    return block
+
+
+def attach(specs: list, h: list):
+    """
+    子进程的 initializer，attach 共享内存中的 CSR 数组
+    :param specs: [(共享内存名称, typecode, 长度)]，依次为 offsets, targets, weights
+    :param h: 虚拟源点到每个顶点的距离
+    :return:
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name, typecode, length in specs]
+    shared['blocks'] = blocks
+    shared['arrays'] = [block.buf.cast(typecode)[:length] for block, (name, typecode, length) in zip(blocks, specs)]
+    shared['h'] = h
+
+
+def dijkstra_rows(sources: range):
+    """
+    在子进程中从每个源点执行 Dijkstra，并还原为原图中的最短路径长度
+    :param sources: 源点 id
+    :return: [(源点 id, 以顶点 id 为下标的最短路径长度 list)]
+    """
+    offsets, targets, weights = shared['arrays']
+    h = shared['h']
+    vexnum = len(h)
+    rows = []
+    for si in sources:
+        d = [sys.maxsize] * vexnum
+        done = [False] * vexnum
+        d[si] = 0
+        heap = [(0, si)]
+        while heap:
+            du, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if d[v] > du + weights[k]:
+                    d[v] = du + weights[k]
+                    heapq.heappush(heap, (d[v], v))
+        rows.append((si, [x - h[si] + h[v] if x != sys.maxsize else sys.maxsize for v, x in enumerate(d)]))
+    return rows
+
+
+def test_johnson():
+    import tempfile
+    from course17.bellman_ford import bellman_ford
+    dg = DirectGraph(merge='min')
+    a = Vertex('a')
+    b = Vertex('b')
+    c = Vertex('c')
+    d = Vertex('d')
+    e = Vertex('e')
+    f = Vertex('f')
+    g = Vertex('g')
+    h = Vertex('h')
+    dg.add_vertex(a)
+    dg.add_vertex(b)
+    dg.add_vertex(c)
+    dg.add_vertex(d)
+    dg.add_vertex(e)
+    dg.add_vertex(f)
+    dg.add_vertex(g)
+    dg.add_vertex(h)
+    dg.add_edge(a, b, 2)
+    dg.add_edge(d, a, 3)
+    dg.add_edge(b, c, 3)
+    dg.add_edge(c, d, 5)
+    dg.add_edge(c, e, 6)
+    dg.add_edge(c, f, 4)
+    dg.add_edge(g, e, -1)
+    dg.add_edge(f, g, 2)
+    dg.add_edge(b, e, 2)
+    dg.add_edge(e, g, 3)
+    dg.add_edge(g, c, -3)
+    dist, vexes = johnson(dg, workers=2, chunk_size=3)
+    print(vexes)
+    print(dist)
+    print(all(dg.by_vertex(dist[i]) == bellman_ford(dg, v)[0] for i, v in enumerate(vexes)))
+    path = os.path.join(tempfile.gettempdir(), 'johnson.bin')
+    johnson_to_file(dg, path, workers=2)
+    with open(path, 'rb') as file:
+        matrix = array('d', file.read())
+    os.remove(path)
+    print(list(matrix[:len(vexes)]))
+
+
+if __name__ == '__main__':
+    test_johnson()
@@ -21,104 +21,118 @@
 # 2.最后一个里程碑的最早达到时间 == 最晚达到时间，因为工程完成的时间只能有一个，所以有 vl(n-1) = ve(n-1)
 # 3.使用反拓扑结构，从栈中一个一个地弹出顶点，求出 vl(i) = Min{vl(j) - len<i, j>}
 # 4.找出所有 e(i) == l(i) 的活动，并且标记为关键活动
+# 修改一个活动的时间后不需要重新计算：
+# ve 只可能在修改的活动的终点及其后继中变化，vl 只可能在修改的活动的起点及其前驱中变化（以及最后一个里程碑变化引起的前驱）
+# 按照拓扑顺序（逆拓扑顺序）从发生变化的顶点开始传播，值没有变化的顶点不再继续传播
+# 活动时间不确定时，对 S 个场景的活动时间（S * E 的矩阵）批量计算：拓扑顺序只求一次，
+# 每个顶点的 ve、vl 对所有场景同时计算（NumPy 向量化），活动的关键度 = 该活动为关键活动的场景比例
 # 求关键路径的算法：
+import heapq
 import sys
 
 from course13.graph import DirectGraph, Vertex
-from course18.topology import CycleException
+from course18.topology import CycleException, kahn
 
 
 def find_key_path(dag: DirectGraph):
     """
     寻找 DAG 中的关键活动，该算法假设图中不存在 negative weight edge
     """
-    stack, vexes, edges, ve, vl, e, l, indegree = initialize(dag)
-    # 使用拓扑顺序 ve，并且将拓扑顺序存储在 stack 中
-    topological_order(dag, stack, vexes, ve, indegree)
-    # stack[-1] 为项目完成的里程碑，最后一个里程碑的最早开始时间==最迟开始时间
-    vl[stack[-1]] = ve[stack[-1]]
-    # 逆拓扑结构求 vl
-    reverse_topology(stack, edges, vl)
+    order, ve, vl = event_times(dag)
+    edges, e, l = initialize_edges(dag)
     # 计算 e(i) l(i)
     key_path = cal_edge_el(vl, ve, e, l, edges)
     return key_path
 
 
+def event_times(dag: DirectGraph):
+    """
+    求拓扑顺序以及每个里程碑的 ve、vl，vl - ve 为里程碑的时差（slack），时差为 0 的里程碑在关键路径上
+    :param dag:
+    :return: order, ve, vl，order 为拓扑顺序
+    """
+    stack, ve, vl = initialize(dag)
+    # 使用拓扑顺序 ve，并且将拓扑顺序存储在 stack 中
+    topological_order(dag, stack, ve)
+    order = list(stack)
+    if order:
+        # stack[-1] 为项目完成的里程碑，最后一个里程碑的最早开始时间==最迟开始时间
+        vl[stack[-1]] = ve[stack[-1]]
+    # 逆拓扑结构求 vl
+    reverse_topology(dag, stack, vl)
+    return order, ve, vl
+
+
 def initialize(dag: DirectGraph):
     """
-    初始化 stack 栈，初始化各顶点的 ve\vl，初始化各边的 e\i
+    初始化 stack 栈，初始化各顶点的 ve\vl
     :param dag:
     :return:
     """
     # 在 python list 就是一个默认实现的 stack
     stack = []
-    vexes = list(dag.vertexes)
+    ve = {v: 0 for v in dag.vertexes}
+    vl = {v: sys.maxsize for v in dag.vertexes}
+    return stack, ve, vl
+
+
+def initialize_edges(dag: DirectGraph):
+    """
+    初始化各边的 e\l
+    :param dag:
+    :return:
+    """
     edges = {(u, v): w for u, pair in dag.edges.items() for v, w in pair}
-    ve = {v: 0 for v in vexes}
-    vl = {v: sys.maxsize for v in vexes}
     e = {x: 0 for x in edges}
     l = {x: sys.maxsize for x in edges}
-    # indegree 记录每个顶点的入度，用于 求拓扑结构
-    indegree = {v: 0 for v in dag.vertexes}
-    for u, pair in dag.edges.items():
-        for v, w in pair:
-            # 发现 u-->v 更新 v 的入度
-            indegree[v] += 1
-    return stack, vexes, edges, ve, vl, e, l, indegree
+    return edges, e, l
 
 
-def topological_order(dag: DirectGraph, stack: list, vexes: list, ve: dict, indegree: dict):
+def topological_order(dag: DirectGraph, stack: list, ve: dict):
     """
     求拓扑结构，并将拓扑顺序保存在栈中，并且求 ve(j) = Max{ve(j) + len<i, j>}
+    使用 course18.topology.kahn 求拓扑结构，顶点生成时它的所有前驱都已经更新过它的 ve
     :param dag:
     :return:
     """
-    # 直到所有顶点都已经加入到拓扑结构中
-    while len(stack) < len(vexes):
-        for v, d in indegree.items():
-            if d == 0:
-                stack.append(v)
-                indegree[v] = -1
-                update(dag, indegree, v, ve)
-                break
-        else:
-            raise CycleException('图中有环，无法计算该图的关键路径')
+    try:
+        for v in kahn(dag):
+            stack.append(v)
+            update(dag, v, ve)
+    except CycleException:
+        raise CycleException('图中有环，无法计算该图的关键路径')
 
 
-def update(dag: DirectGraph, indegree: dict, v: Vertex, ve: dict):
+def update(dag: DirectGraph, v: Vertex, ve: dict):
     """
-    当一个新的顶点加入到拓扑结构后，需要进行 indegree 的更新，以及 ve 的更新
+    当一个新的顶点加入到拓扑结构后，进行 ve 的更新
     :param dag:
-    :param indegree:
     :param v:
     :param ve:
     :return:
     """
     for u, w in dag.edges[v]:
-        indegree[u] -= 1
         # ve[u] = Max{ve[u], ve[v] + w}
         if ve[v] + w > ve[u]:
             ve[u] = ve[v] + w
 
 
-def reverse_topology(stack: list, edges: dict, vl: dict):
+def reverse_topology(dag: DirectGraph, stack: list, vl: dict):
     """
     通过逆拓扑结构求 vl
     vl[i] = Min{vl[j] - len<i, j>}
+    :param dag:
     :param stack:
-    :param edges:
     :param vl:
     :return:
     """
     while stack:
         top = stack.pop()
-        # 遍历所有以 top 结尾的弧
-        for x, y in edges:
-            if y == top:
-                # 这里虽然新创建了 Edge 对象，但是 Edge 的 hash 只取决于两个顶点对象，所以如果 source target 相同就默认为同一条边
-                t = vl[top] - edges[(x, top)]
-                if vl[x] > t:
-                    vl[x] = t
+        # 通过反向邻接链表遍历所有以 top 结尾的弧
+        for x, w in dag.in_edges(top):
+            t = vl[top] - w
+            if vl[x] > t:
+                vl[x] = t
 
 
 def cal_edge_el(vl: dict, ve: dict, e: dict, l: dict, edges: dict):
@@ -140,6 +154,171 @@ def cal_edge_el(vl: dict, ve: dict, e: dict, l: dict, edges: dict):
     return key_path
 
 
+class CriticalPath(object):
+    """
+    可以增量更新的关键路径，保存拓扑顺序以及每个里程碑的 ve、vl
+    两个顶点之间只保留一个活动，与 find_key_path 中的 edges 一致
+    """
+
+    def __init__(self, dag: DirectGraph) -> None:
+        super().__init__()
+        self.order, self.ve, self.vl = event_times(dag)
+        self.position = {v: i for i, v in enumerate(self.order)}
+        self.edges, e, l = initialize_edges(dag)
+        self.successors = {v: [] for v in self.order}
+        self.predecessors = {v: [] for v in self.order}
+        for u, v in self.edges:
+            self.successors[u].append(v)
+            self.predecessors[v].append(u)
+        self.critical = set(cal_edge_el(self.vl, self.ve, e, l, self.edges))
+
+    def key_path(self) -> dict:
+        """
+        关键活动以及它们的最早开始时间，与 find_key_path 的返回值相同
+        """
+        return {pair: self.ve[pair[0]] for pair in self.edges if pair in self.critical}
+
+    def is_critical(self, pair: tuple) -> bool:
+        u, v = pair
+        return self.ve[u] == self.vl[v] - self.edges[pair]
+
+    def set_weight(self, u: Vertex, v: Vertex, w):
+        """
+        修改活动 u-->v 的时间，只重新计算受影响的顶点
+        :param u:
+        :param v:
+        :param w: 新的时间
+        :return: entered, left，新成为关键活动的集合，不再是关键活动的集合
+        """
+        if (u, v) not in self.edges:
+            raise KeyError('活动 {}-->{} 不在图中'.format(u, v))
+        self.edges[(u, v)] = w
+        last = self.order[-1]
+        changed = self.forward(v)
+        seeds = [u]
+        if last in changed:
+            seeds.append(last)
+        changed |= self.backward(seeds)
+        # 只有端点的 ve、vl 发生变化的活动，以及被修改的活动，才可能改变是否为关键活动
+        candidates = {(u, v)}
+        for x in changed:
+            candidates.update((x, y) for y in self.successors[x])
+            candidates.update((y, x) for y in self.predecessors[x])
+        entered, left = set(), set()
+        for pair in candidates:
+            critical = self.is_critical(pair)
+            if critical and pair not in self.critical:
+                self.critical.add(pair)
+                entered.add(pair)
+            elif not critical and pair in self.critical:
+                self.critical.remove(pair)
+                left.add(pair)
+        return entered, left
+
+    def forward(self, start: Vertex) -> set:
+        """
+        从 start 开始按照拓扑顺序重新计算 ve(j) = Max{ve(i) + len<i, j>}
+        :return: ve 发生变化的顶点
+        """
+        changed = set()
+        heap = [(self.position[start], start)]
+        queued = {start}
+        while heap:
+            p, x = heapq.heappop(heap)
+            ve = max((self.ve[y] + self.edges[(y, x)] for y in self.predecessors[x]), default=0)
+            if ve == self.ve[x]:
+                continue
+            self.ve[x] = ve
+            changed.add(x)
+            for y in self.successors[x]:
+                if y not in queued:
+                    queued.add(y)
+                    heapq.heappush(heap, (self.position[y], y))
+        return changed
+
+    def backward(self, seeds: list) -> set:
+        """
+        从 seeds 开始按照逆拓扑顺序重新计算 vl(i) = Min{vl(j) - len<i, j>}，最后一个里程碑的 vl = ve
+        :return: vl 发生变化的顶点
+        """
+        changed = set()
+        last = self.order[-1]
+        heap = [(-self.position[x], x) for x in seeds]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        while heap:
+            p, x = heapq.heappop(heap)
+            if x == last:
+                vl = self.ve[x]
+            else:
+                vl = min((self.vl[y] - self.edges[(x, y)] for y in self.successors[x]), default=sys.maxsize)
+            if vl == self.vl[x]:
+                continue
+            self.vl[x] = vl
+            changed.add(x)
+            for y in self.predecessors[x]:
+                if y not in queued:
+                    queued.add(y)
+                    heapq.heappush(heap, (-self.position[y], y))
+        return changed
+
+
+def activities(dag: DirectGraph) -> list:
+    """
+    图中所有活动 (u, v)，criticality 中活动时间矩阵的列按照这个顺序排列
+    """
+    return list(initialize_edges(dag)[0])
+
+
+def criticality(dag: DirectGraph, durations, batch: int = 1024, eps: float = 1e-9) -> dict:
+    """
+    Monte Carlo 关键度分析：对每个场景求关键活动，统计每个活动为关键活动的比例
+    每个场景的计算与 find_key_path 相同，但是所有场景共用一次拓扑排序，每个顶点的 ve、vl 对一批场景向量化计算
+    :param dag:
+    :param durations: S * E 的 NumPy 矩阵，durations[s][k] 为第 s 个场景中 activities(dag)[k] 的时间
+    :param batch: 每批计算的场景数，ve、vl 占用 batch * V 个 float64
+    :param eps: 浮点数时间的相对误差，松弛时间不超过 eps * 该场景的总工期时视为关键活动；整数时间精确比较，不使用 eps
+    :return: {活动: 关键度}，关键度在 [0, 1] 之间
+    """
+    import numpy as np
+    durations = np.asarray(durations)
+    exact = np.issubdtype(durations.dtype, np.integer)
+    durations = durations.astype(np.float64)
+    pairs = activities(dag)
+    order = event_times(dag)[0]
+    position = {v: i for i, v in enumerate(order)}
+    src = np.array([position[u] for u, v in pairs], dtype=np.int64)
+    dst = np.array([position[v] for u, v in pairs], dtype=np.int64)
+    # incoming[j]、outgoing[i] 为以顶点 j 结尾、以顶点 i 开始的活动的列号
+    incoming = [[] for _ in order]
+    outgoing = [[] for _ in order]
+    for k, (u, v) in enumerate(pairs):
+        incoming[position[v]].append(k)
+        outgoing[position[u]].append(k)
+    incoming = [np.array(cols, dtype=np.int64) for cols in incoming]
+    outgoing = [np.array(cols, dtype=np.int64) for cols in outgoing]
+    count = np.zeros(len(pairs), dtype=np.int64)
+    for start in range(0, len(durations), batch):
+        d = durations[start:start + batch]
+        ve = np.zeros((len(d), len(order)))
+        for j, cols in enumerate(incoming):
+            if len(cols):
+                ve[:, j] = (ve[:, src[cols]] + d[:, cols]).max(axis=1)
+        # 与 find_key_path 一致：只有最后一个里程碑的 vl = ve，其他没有后继的顶点 vl 为无穷大
+        vl = np.full((len(d), len(order)), np.inf)
+        if len(order):
+            vl[:, -1] = ve[:, -1]
+        for i in range(len(order) - 2, -1, -1):
+            cols = outgoing[i]
+            if len(cols):
+                vl[:, i] = (vl[:, dst[cols]] - d[:, cols]).min(axis=1)
+        # e(i) = ve(j)，l(i) = vl(k) - len<j, k>，松弛时间 l(i) - e(i) 只与总工期比较，不使用 np.isclose 默认的相对误差
+        # 否则总工期很大时，松弛时间很小但不为 0 的活动也会被视为关键活动
+        tolerance = 0 if exact or not len(order) else eps * ve[:, -1:]
+        count += (np.abs(vl[:, dst] - d - ve[:, src]) <= tolerance).sum(axis=0)
+    return {pair: int(count[k]) / max(len(durations), 1) for k, pair in enumerate(pairs)}
+
+
 def test():
     # 以下图中有两条关键路径
     # 1： a-->b-->e-->g-->h
@@ -179,4 +358,24 @@ def test():
 
     key_path = find_key_path(dag)
     print(key_path)
+    cp = CriticalPath(dag)
+    print(cp.key_path() == key_path)
+    # 活动 d-->i 延长 4 后 a-->d-->i-->g-->h 成为唯一的关键路径，原来的两条关键路径都不再是关键路径
+    print(cp.set_weight(d, i, 6))
+    print(cp.key_path())
+    import numpy as np
+    # 每个活动的时间在原来的基础上随机波动
+    base = np.array(list(initialize_edges(dag)[0].values()))
+    samples = base * np.random.default_rng(0).uniform(0.5, 1.5, size=(10000, len(base)))
+    print(criticality(dag, samples))
+    # 总工期约为 1e6 时松弛时间为 5 的活动 b-->c、c-->d 不是关键活动
+    big = DirectGraph()
+    for v in (a, b, c, d):
+        big.add_vertex(v)
+    big.add_edge(a, b, 10 ** 6)
+    big.add_edge(b, d, 10)
+    big.add_edge(b, c, 5)
+    big.add_edge(c, d, 0)
+    weights = np.array(list(initialize_edges(big)[0].values()))
+    print(criticality(big, weights[None, :]), criticality(big, weights[None, :] + 0.1))
 
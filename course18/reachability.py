@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# author: Xiguang Liu<g10guang@foxmail.com>
+# 2026-10-17
+# 可达性索引：预处理后 O(1) 回答 "u 能否到达 v"，不需要像 Floyd 那样计算距离，也不需要每次查询都 BFS
+# 1. 同一个强连通分量（SCC）中的顶点可以相互到达，所以先使用 course13.graph.strongly_connected_components 求出所有 SCC，
+#    将每个 SCC 缩为一个顶点，得到 DAG
+# 2. 使用 course18.topology 求 DAG 的拓扑结构，按照逆拓扑顺序处理每个 SCC，
+#    SCC c 能到达的集合 = {c} ∪ c 的所有后继能到达的集合，使用 Python int 作为 bitset，一次按位或合并一个后继
+# 3. 每个 SCC 的 bitset 转为定长的 bytes 连续存储，C 个 SCC 一共 C * ceil(C / 8) <= V^2 / 8 字节
+#    查询时根据 SCC 编号找到对应的字节和位，时间复杂度为 O(1)
+
+from course13.graph import DirectGraph, Vertex, strongly_connected_components
+from course18.topology import topology
+
+
+class Reachability(object):
+    """
+    可达性索引
+    component[i] 为 id 为 i 的顶点所在 SCC 的编号
+    第 c 个 SCC 的 bitset 为 bits[c * width:(c + 1) * width]，第 x 位为 1 代表可以到达第 x 个 SCC
+    """
+
+    def __init__(self, g: DirectGraph) -> None:
+        """
+        构建可达性索引，之后图发生变化需要重新构建
+        :param g: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+        """
+        super().__init__()
+        self.ids = dict(g.ids)
+        self.component, count = strongly_connected_components(g)
+        self.width = (count + 7) // 8
+        self.bits = bytearray(count * self.width)
+        dag = condense(g, self.component, count)
+        reach = [0] * count
+        for cv in reversed(topology(dag)):
+            c = cv.value
+            bitset = 1 << c
+            for x, w in dag.edges[cv]:
+                bitset |= reach[x.value]
+            reach[c] = bitset
+            self.bits[c * self.width:(c + 1) * self.width] = bitset.to_bytes(self.width, 'little')
+
+    def reaches(self, u: Vertex, v: Vertex) -> bool:
+        """
+        u 能否到达 v，每个顶点都可以到达自身
+        :param u:
+        :param v:
+        :return:
+        """
+        cu, cv = self.component[self.ids[u]], self.component[self.ids[v]]
+        return bool(self.bits[cu * self.width + (cv >> 3)] >> (cv & 7) & 1)
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self.bits.__sizeof__()
+
+
+def condense(g: DirectGraph, component: list, count: int) -> DirectGraph:
+    """
+    将每个 SCC 缩为一个顶点，得到 DAG，顶点的 value 为 SCC 的编号，两个 SCC 之间最多一条边
+    """
+    dag = DirectGraph()
+    vexes = [Vertex(c) for c in range(count)]
+    for v in vexes:
+        dag.add_vertex(v)
+    added = set()
+    for u in range(g.get_vertex_num()):
+        cu = component[u]
+        for v, w in g.adjacent(u):
+            cv = component[v]
+            if cu != cv and (cu, cv) not in added:
+                added.add((cu, cv))
+                dag.add_edge(vexes[cu], vexes[cv])
+    return dag
+
+
+def test():
+    dg = DirectGraph()
+    a = Vertex('a')
+    b = Vertex('b')
+    c = Vertex('c')
+    d = Vertex('d')
+    e = Vertex('e')
+    f = Vertex('f')
+    g = Vertex('g')
+    h = Vertex('h')
+    dg.add_vertex(a)
+    dg.add_vertex(b)
+    dg.add_vertex(c)
+    dg.add_vertex(d)
+    dg.add_vertex(e)
+    dg.add_vertex(f)
+    dg.add_vertex(g)
+    dg.add_vertex(h)
+    dg.add_edge(a, b, 2)
+    dg.add_edge(b, c, 3)
+    dg.add_edge(c, a, 5)
+    dg.add_edge(c, d, 6)
+    dg.add_edge(d, e, 4)
+    dg.add_edge(e, f, 1)
+    dg.add_edge(f, d, 2)
+    dg.add_edge(h, f, 3)
+
+    print(strongly_connected_components(dg))
+    index = Reachability(dg)
+    print(index.reaches(a, f), index.reaches(f, a), index.reaches(d, f), index.reaches(f, d))
+    print(index.reaches(h, e), index.reaches(a, h), index.reaches(g, g))
+    print(len(index.bits))
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# author: Xiguang Liu<g10guang@foxmail.com>
+# 2026-10-17
+# 使用线程池或者进程池执行 DAG 中的任务
+# 每个顶点为一个任务，边 u-->v 代表 v 依赖 u，权重为 u 的预计执行时间，u 有多条出边时取最大的权重，没有出边的任务执行时间为 0
+# 1. 将每个任务的执行时间作为它所有出边的权重，所有没有出边的任务连接到一个虚拟的终点，
+#    使用 course18.key_pah.event_times 求出每个任务的最早开始时间 ve、最晚开始时间 vl，时差 slack = vl - ve，
+#    虚拟终点的 ve 为关键路径长度，即任务数量不受限制时的最短完成时间（下界）
+# 2. 入度为 0 的任务进入就绪队列，按照 slack 从小到大取出，slack 越小越接近关键路径，越应该先执行
+# 3. 任务完成后更新后继的入度，入度变为 0 的后继进入就绪队列
+# 同时提交给执行器的任务数不超过 workers，保证就绪队列中的优先级生效
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from course13.graph import DirectGraph, Vertex
+from course18.key_pah import event_times
+from course18.topology import initialize
+
+EXECUTORS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+
+class Schedule(object):
+    """
+    调度结果
+    start[v]、finish[v] 为任务 v 的开始、完成时间
+    makespan 为所有任务完成的时间，critical_path 为关键路径长度，makespan >= critical_path
+    """
+
+    def __init__(self, start: dict, finish: dict, critical_path) -> None:
+        super().__init__()
+        self.start = start
+        self.finish = finish
+        self.makespan = max(finish.values(), default=0)
+        self.critical_path = critical_path
+
+    def __repr__(self) -> str:
+        return 'makespan: {}, critical path: {}'.format(self.makespan, self.critical_path)
+
+
+def priorities(dag: DirectGraph, durations: dict = None):
+    """
+    求每个任务的执行时间以及 slack
+    :param dag:
+    :param durations: 每个任务的执行时间，为 None 时使用出边的最大权重
+    :return: duration, slack, critical_path
+    """
+    if durations is None:
+        durations = {v: max((w for u, w in dag.edges[v]), default=0) for v in dag.vertexes}
+    # 复制一个图，每条出边的权重统一为任务的执行时间，并添加虚拟终点
+    tasks = DirectGraph()
+    sink = Vertex(object())
+    for v in dag.vertexes:
+        tasks.add_vertex(v)
+    tasks.add_vertex(sink)
+    for v in dag.vertexes:
+        if dag.edges[v]:
+            for u, w in dag.edges[v]:
+                tasks.add_edge(v, u, durations[v])
+        else:
+            tasks.add_edge(v, sink, durations[v])
+    order, ve, vl = event_times(tasks)
+    slack = {v: vl[v] - ve[v] for v in dag.vertexes}
+    return durations, slack, ve[sink]
+
+
+def schedule(dag: DirectGraph, run, workers: int = 4, executor: str = 'thread', durations: dict = None) -> Schedule:
+    """
+    执行 DAG 中的所有任务，一个任务的所有前驱完成后立即提交给执行器
+    :param dag: 边 u-->v 代表 v 依赖 u
+    :param run: run(v) 执行任务 v，使用进程池时 run 必须可以 pickle
+    :param workers: 同时执行的任务数，小于 1 时抛出 ValueError
+    :param executor: 'thread' 或者 'process'
+    :param durations: 每个任务的预计执行时间（秒），为 None 时使用出边的最大权重
+    :return: Schedule，时间为从开始调度经过的秒数，图中有环时抛出 course18.topology.CycleException
+    """
+    if workers < 1:
+        raise ValueError('workers should be at least 1 but {} is given'.format(workers))
+    durations, slack, critical_path = priorities(dag, durations)
+    indegree = initialize(dag)
+    # 就绪队列 (slack, 序号, 任务)，序号保证 slack 相同时按照就绪的顺序执行
+    ready = []
+    seq = 0
+    for v, c in indegree.items():
+        if c == 0:
+            heapq.heappush(ready, (slack[v], seq, v))
+            seq += 1
+    start, finish = {}, {}
+    running = {}
+    begin = time.perf_counter()
+    with EXECUTORS[executor](max_workers=workers) as pool:
+        while ready or running:
+            while ready and len(running) < workers:
+                s, i, v = heapq.heappop(ready)
+                start[v] = time.perf_counter() - begin
+                running[pool.submit(run, v)] = v
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                v = running.pop(future)
+                # 任务中的异常在这里抛出
+                future.result()
+                finish[v] = time.perf_counter() - begin
+                for u, w in dag.edges[v]:
+                    indegree[u] -= 1
+                    if indegree[u] == 0:
+                        heapq.heappush(ready, (slack[u], seq, u))
+                        seq += 1
+    return Schedule(start, finish, critical_path)
+
+
+def simulate(dag: DirectGraph, workers: int = 4, durations: dict = None) -> Schedule:
+    """
+    不执行任务，按照预计执行时间模拟 schedule 的调度过程，用于比较不同 workers 下的 makespan
+    :param dag: 边 u-->v 代表 v 依赖 u
+    :param workers: 同时执行的任务数，小于 1 时抛出 ValueError
+    :param durations: 每个任务的预计执行时间，为 None 时使用出边的最大权重
+    :return: Schedule，时间为预计执行时间的单位
+    """
+    if workers < 1:
+        raise ValueError('workers should be at least 1 but {} is given'.format(workers))
+    durations, slack, critical_path = priorities(dag, durations)
+    indegree = initialize(dag)
+    ready = []
+    seq = 0
+    for v, c in indegree.items():
+        if c == 0:
+            heapq.heappush(ready, (slack[v], seq, v))
+            seq += 1
+    start, finish = {}, {}
+    # 正在执行的任务 (完成时间, 序号, 任务)
+    running = []
+    now = 0
+    while ready or running:
+        while ready and len(running) < workers:
+            s, i, v = heapq.heappop(ready)
+            start[v] = now
+            heapq.heappush(running, (now + durations[v], i, v))
+        now, i, v = heapq.heappop(running)
+        finish[v] = now
+        for u, w in dag.edges[v]:
+            indegree[u] -= 1
+            if indegree[u] == 0:
+                heapq.heappush(ready, (slack[u], seq, u))
+                seq += 1
+    return Schedule(start, finish, critical_path)
+
+
+def test():
+    dag = DirectGraph()
+    a = Vertex('a')
+    b = Vertex('b')
+    c = Vertex('c')
+    d = Vertex('d')
+    e = Vertex('e')
+    f = Vertex('f')
+    g = Vertex('g')
+    h = Vertex('h')
+    i = Vertex('i')
+
+    dag.add_vertex(a)
+    dag.add_vertex(b)
+    dag.add_vertex(c)
+    dag.add_vertex(d)
+    dag.add_vertex(e)
+    dag.add_vertex(f)
+    dag.add_vertex(g)
+    dag.add_vertex(h)
+    dag.add_vertex(i)
+
+    dag.add_edge(a, b, 6)
+    dag.add_edge(a, c, 6)
+    dag.add_edge(a, d, 6)
+    dag.add_edge(b, e, 1)
+    dag.add_edge(c, e, 1)
+    dag.add_edge(d, i, 2)
+    dag.add_edge(e, f, 9)
+    dag.add_edge(e, g, 9)
+    dag.add_edge(f, h, 2)
+    dag.add_edge(g, h, 4)
+    dag.add_edge(i, g, 4)
+
+    durations, slack, critical_path = priorities(dag)
+    print(slack, critical_path)
+    print(simulate(dag, workers=1), simulate(dag, workers=2))
+    # 预计执行时间的单位为 10ms
+    seconds = {v: t / 100 for v, t in durations.items()}
+    result = schedule(dag, lambda v: time.sleep(seconds[v]), workers=2, durations=seconds)
+    print(result, {v: round(t, 2) for v, t in result.finish.items()})
+    try:
+        simulate(dag, workers=0)
+    except ValueError as exception:
+        print(exception)
+
+
+if __name__ == '__main__':
+    test()
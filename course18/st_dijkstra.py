@@ -4,134 +4,74 @@
 # 2018-01-22 20:02
 # 如果在图中需要搜索的目标是 single-source s and single-target t，那么可以对 Dijkstra 算法进行优化
 # 如果新加入 S 的顶点为 t，那么可以停止搜索
+# 只需要为访问过的顶点分配 d 和 pai，不需要像 course16.dijkstra 那样初始化所有顶点
 
 
 import sys
 
 from course13.graph import DirectGraph, Vertex
+from course16.dijkstra import BUCKET_BOUND, new_queue
 
 
-def dijkstra_single_source_single_target(dg: DirectGraph, s: Vertex, t: Vertex):
+def dijkstra_single_source_single_target(dg: DirectGraph, s: Vertex, t: Vertex, queue: str = 'auto',
+                                         bucket_bound: int = BUCKET_BOUND):
     """
     使用 Dijkstra 遍历有向无环图，假设该图为有向无环图 DAG，以下代码不做判断
     寻找 DAG 中 s-->t 的最短路径
-    :param dg: course13.graph.DirectGraph
-    :param s: 寻找DAG中所有顶点到 s 的最短路径 S.P
+    只访问距离 s 不超过 d(s, t) 的顶点：d、pai 为只记录已经访问过的顶点的 dict，在第一次访问到顶点时才分配
+    :param dg: course13.graph.DirectGraph 或者 course13.graph.CSRGraph
+    :param s: 源点
     :param t: 目标顶点
-    :return:
+    :param queue: 与 course16.dijkstra.dijkstra 的 queue 参数相同，
+                  选择优先队列时不扫描全图的权重：'auto' 和 'dial' 使用图中缓存的 int_weight_bound，'radix' 在 push 时检查，
+                  注意 'dial' 需要分配 最大权重 + 1 个 bucket，与访问的顶点数量无关
+    :param bucket_bound: 与 course16.dijkstra.dijkstra 的 bucket_bound 参数相同
+    :return: s-->t 的最短路径长度以及路径上的顶点 [s, ..., t]，不存在路径时返回 sys.maxsize, []
     """
     if not dg.has_vertex(s):
         print(dg)
-        raise Exception("顶点: {} 不在 DAG 中")
-    # S 为已经找到最短路径的顶点
-    # Q 为尚未找到最短路径的顶点
-    # d 为对应目前迭代中该顶点到 s 的距离
-    # pai 用于记录在最短路径中，该顶点的上一个顶点
-    S, Q, d, pai = initialize(dg, s)
-    while Q:
-        # extract-min from Q
-        v, minimize = extract_min(Q, d)
+        raise Exception("顶点: {} 不在 DAG 中".format(s))
+    if not dg.has_vertex(t):
+        raise Exception("顶点: {} 不在 DAG 中".format(t))
+    si, ti = dg.ids[s], dg.ids[t]
+    pq = new_queue(dg, queue, bucket_bound)
+    # 以顶点 id 为键，只保存已经访问过的顶点
+    d = {si: 0}
+    pai = {si: None}
+    # 已经找到最短路径的顶点
+    S = set()
+    pq.push(0, si)
+    while pq:
+        dv, v = pq.pop()
+        if v in S:
+            # lazy deletion 留下的过期记录
+            continue
+        S.add(v)
         # 如果 v == t 那么可以停止搜索，已经找到了目标 s-->t 最短路径
-        if v == t:
-            S.add(v)
-            Q.remove(v)
-            break
-        if v is not None:
-            S.add(v)
-            Q.remove(v)
-            relax(dg, d, pai, v)
-        else:
-            # 所有可以被 S 达到的顶点都已经被遍历，剩下的顶点无法从 s 到达
-            # 有可能 s-x->t 不存在这样的路径，也就是 d[t] = sys.maxsize
-            break
-    return d, pai
-
-
-def initialize(dg: DirectGraph, s):
-    """
-    在进行 Dijkstra 算法前先进行初始化数据
-    :param dg:
-    :param s:
-    :return:
-    """
-    # 所有已经找到了最短路径的顶点集和
-    S = {s}
-    # 所有还没有找到最短路径的顶点集和
-    Q = set()
-    d = {s: 0}
-    pai = {s: None}
-    # 将所有非 s 顶点加入到 Q 中
-    for v in dg.vertexes:
-        pai[v] = None
-        if v != s:
-            Q.add(v)
-            d[v] = dg.get_edge_weight(s, v)
-            if d[v] < sys.maxsize:
-                pai[v] = s
-    return S, Q, d, pai
-
-
-def extract_min(Q, d) -> (Vertex, int):
-    """
-    从 Q 中寻找 d[v] 最小者
-    在这里如果 Q 不是 set，而是 min heap 最小堆，那么该算法将会得到更优的结果，使用 Fibonacci heap 会得到更加优化的结果
-    因为 extract_min 是该算法中的性能热点，每次都要执行，而且如果是 set 的弧每次时间复杂度是 O(n)
-    :param Q:
-    :param d:
-    :return:
-    """
-    minimize = sys.maxsize
-    v = None
-    for x in Q:
-        if minimize > d[x]:
-            minimize = d[x]
-            v = x
-    return v, minimize
-
-
-def relax(dg: DirectGraph, d: dict, pai: dict, v: Vertex):
-    """
-    加入新的顶点到 S 后，更新 d
-    :param dg:
-    :param d:
-    :param v: 新加入的顶点
-    :param pai:
-    :return:
-    """
-    for x, weight in dg.edges[v]:
-        if d[x] > d[v] + weight:
-            d[x] = d[v] + weight
-            # 即使当前找到的 v-->x 不是最优路径，但是如果存在最优路径 y-->x，那么后面也绝对会再次更新 pai，所以 Dijkstra 算法结束后，
-            # 一定得到 pai[x] 是在最短路径中 x 的上一个顶点，Dijkstra 是一个贪心算法，不断地趋近最优解
-            pai[x] = v
-
-
-def print_shortest_path(pai: dict, s: Vertex, t: Vertex):
-    """
-    在控制台输出最短路径
-    :param pai: 记录这每个顶点的上一个访问顶点
-    :param s: 源点 source
-    :param t: 目标 target
-    :return:
-    """
-    if not pai[t]:
-        # 不存在路径 s-->t
-        print('path from {s} to {t} is not exist'.format(s=repr(s), t=repr(t)))
-    else:
-        print_path(pai, t)
-        print(t)
-
-
-def print_path(pai: dict, v: Vertex):
+        if v == ti:
+            return dv, [dg.vexes[i] for i in path_to(pai, ti)]
+        for x, weight in dg.adjacent(v):
+            if x not in d or d[x] > dv + weight:
+                d[x] = dv + weight
+                pai[x] = v
+                pq.push(d[x], x)
+    # 所有可以从 s 到达的顶点都已经被遍历，s-x->t 不存在这样的路径
+    return sys.maxsize, []
+
+
+def path_to(pai: dict, v):
     """
-    递归调用打印输出路径
-    :param pai:
+    沿着 pai 从 v 回溯到源点，得到源点到 v 的路径
+    :param pai: 记录这每个顶点的上一个访问顶点，源点的上一个顶点为 None
     :param v:
-    :return:
+    :return: [源点, ..., v]
     """
-    if pai[v]:
-        print_path(pai, pai[v])
-        print(pai[v], end='-->')
+    path = []
+    while v is not None:
+        path.append(v)
+        v = pai[v]
+    path.reverse()
+    return path
 
 
 def test_dijkstra_single_source_single_target():
@@ -163,10 +103,11 @@ def test_dijkstra_single_source_single_target():
 
     s, t = a, g
 
-    d, pai = dijkstra_single_source_single_target(dg, s, t)
-    print(d, pai)
-    print('=======')
-    print_shortest_path(pai, s, t)
+    for queue in ('auto', 'heap', 'dial', 'radix'):
+        distance, path = dijkstra_single_source_single_target(dg, s, t, queue=queue)
+        print(distance, '-->'.join(repr(v) for v in path))
+    # 不存在路径 e-->a
+    print(dijkstra_single_source_single_target(dg, e, a))
 
 
 if __name__ == '__main__':
@@ -6,6 +6,10 @@
 # 如果图不是有向无环图，那么不能求得拓扑结构
 # 算法：
 # 1. 从还没加入拓扑结构的顶点中选取一个入度为 0 的顶点，将该顶点加入拓扑结构，并去除与该顶点相关的所有边，更新每个顶点的入度，重复 1
+# Kahn 算法：使用队列保存入度为 0、还没有加入拓扑结构的顶点，去除边时入度变为 0 的顶点入队，
+# 不需要每次扫描所有顶点的入度，时间复杂度为 O(V+E)
+# levels：同一层的顶点之间没有依赖关系（antichain），可以同时执行，第 i 层的顶点只依赖前 i - 1 层的顶点
+from collections import deque
 
 from course13.graph import DirectGraph, Vertex
 
@@ -22,22 +26,45 @@ def topology(dag: DirectGraph):
     :param dag:
     :return:
     """
+    return list(kahn(dag))
+
+
+def kahn(dag: DirectGraph):
+    """
+    使用 Kahn 算法求 DAG 的拓扑结构，返回生成器，可以一边计算一边使用
+    生成完所有能加入拓扑结构的顶点后才能发现图中有环，此时抛出 CycleException
+    :param dag:
+    :return: 按照拓扑顺序生成顶点
+    """
+    indegree = initialize(dag)
+    # 入度为 0、还没有加入拓扑结构的顶点
+    ready = deque(v for v, c in indegree.items() if c == 0)
+    count = 0
+    while ready:
+        v = ready.popleft()
+        count += 1
+        yield v
+        ready.extend(update(dag, v, indegree))
+    if count < dag.get_vertex_num():
+        # 图中有环，无法计算该图的拓扑结构
+        raise CycleException('图中有环，无法计算该图的拓扑结构')
+
+
+def levels(dag: DirectGraph):
+    """
+    按层求 DAG 的拓扑结构，同一层的顶点之间没有依赖关系，可以同时执行
+    :param dag:
+    :return: 按照拓扑顺序生成每一层的顶点 list
+    """
     indegree = initialize(dag)
-    # 顶点加入拓扑结构的顺序
-    order = []
-    vexnum = dag.get_vertex_num()
-    while len(order) < vexnum:
-        for v, c in indegree.items():
-            if c == 0:
-                order.append(v)
-                # 更新 -1 代表已经加入了拓扑结果
-                indegree[v] = -1
-                update(dag, v, indegree)
-                break
-        else:
-            # 图中有环，无法计算该图的拓扑结构
-            raise CycleException('图中有环，无法计算该图的拓扑结构')
-    return order
+    level = [v for v, c in indegree.items() if c == 0]
+    count = 0
+    while level:
+        count += len(level)
+        yield level
+        level = [u for v in level for u in update(dag, v, indegree)]
+    if count < dag.get_vertex_num():
+        raise CycleException('图中有环，无法计算该图的拓扑结构')
 
 
 def initialize(dag: DirectGraph):
@@ -46,22 +73,22 @@ def initialize(dag: DirectGraph):
     :param dag:
     :return:
     """
-    # 记录每个顶点的入度
-    indegree = {v: 0 for v in dag.vertexes}
-    for u, pair in dag.edges.items():
-        for v, w in pair:
-            # 发现 u-->v 更新 v 的入度
-            indegree[v] += 1
-    return indegree
+    # 记录每个顶点的入度，直接由反向邻接链表得到
+    return {v: len(dag.in_edges(v)) for v in dag.vertexes}
 
 
 def update(dag: DirectGraph, v: Vertex, indegree: dict):
     """
     顶点 v 加入到拓扑结构后更新 indegree
     取消所有与 v 相关的入度
+    :return: 入度变为 0 的顶点
     """
+    ready = []
     for u, w in dag.edges[v]:
         indegree[u] -= 1
+        if indegree[u] == 0:
+            ready.append(u)
+    return ready
 
 
 def test_topology():
@@ -91,6 +118,7 @@ def test_topology():
 
     order = topology(dag)
     print(order)
+    print(list(levels(dag)))
 
 
 def test_cycle():
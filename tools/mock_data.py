@@ -24,6 +24,25 @@ def mock_2d_matrix(n, m):
     return [[random.randint(0, 20) for _ in range(m)] for _ in range(n)]
 
 
+def mock_direct_graph(vexnum, edgenum, max_weight=20, merge=None):
+    """
+    随机生成 vexnum 个顶点、edgenum 条边的有向图，权重为 [0, max_weight] 的整数
+    :param vexnum:
+    :param edgenum:
+    :param max_weight:
+    :param merge: 传给 course13.graph.DirectGraph 的 merge 参数
+    :return: 图以及按照 id 排列的顶点
+    """
+    from course13.graph import DirectGraph, Vertex
+    dg = DirectGraph(merge=merge)
+    vexes = [Vertex(i) for i in range(vexnum)]
+    for v in vexes:
+        dg.add_vertex(v)
+    for _ in range(edgenum):
+        dg.add_edge(random.choice(vexes), random.choice(vexes), random.randint(0, max_weight))
+    return dg, vexes
+
+
 if __name__ == '__main__':
     result = mock_2d_matrix(3, 4)
     print(result)
\ No newline at end of file